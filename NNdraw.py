@@ -1,6 +1,7 @@
 import pygame as py
 from config_variables import *
 from node import Node, Connection
+from textcache import get_font
 
 py.font.init()
 
@@ -87,7 +88,9 @@ class NN:
                 )
                 self.connections.append(conn)
 
-        self.title_font = py.font.SysFont("consolas", 18, bold=True)
+        self.title_font = get_font("consolas", 18, bold=True)
+        #pre-rendered static part of the visualization, see _render_layer
+        self._layer = None
 
     def _panel_rect(self):
         xs = [n.x for n in self.nodes]
@@ -102,13 +105,13 @@ class NN:
 
         return py.Rect(left, top, right - left, bottom - top)
 
-    def _draw_panel(self, world):
+    def _draw_panel(self, surface, ox, oy):
         rect = self._panel_rect()
 
         # Shadow
         shadow = py.Surface((rect.w + 8, rect.h + 8), py.SRCALPHA)
         py.draw.rect(shadow, (0, 0, 0, 60), shadow.get_rect(), border_radius=18)
-        world.win.blit(shadow, (rect.x + 4, rect.y + 4))
+        surface.blit(shadow.premul_alpha(), (rect.x + 4 - ox, rect.y + 4 - oy), special_flags=py.BLEND_PREMULTIPLIED)
 
         # Panel
         panel = py.Surface((rect.w, rect.h), py.SRCALPHA)
@@ -124,9 +127,9 @@ class NN:
         title = self.title_font.render("Neural Network (Best Genome)", True, (20, 20, 20))
         panel.blit(title, (16, 10))
 
-        world.win.blit(panel, (rect.x, rect.y))
+        surface.blit(panel.premul_alpha(), (rect.x - ox, rect.y - oy), special_flags=py.BLEND_PREMULTIPLIED)
 
-    def _draw_pretty_connection(self, world, conn):
+    def _draw_pretty_connection(self, surface, conn, ox, oy):
         # Your Connection stores weight in conn.wt
         w = float(getattr(conn, "wt", 0.0))
         absw = abs(w)
@@ -145,8 +148,8 @@ class NN:
         n1 = conn.input
         n2 = conn.output
 
-        x1, y1 = n1.x, n1.y
-        x2, y2 = n2.x, n2.y
+        x1, y1 = n1.x - ox, n1.y - oy
+        x2, y2 = n2.x - ox, n2.y - oy
 
         # Gentle curve
         mx, my = (x1 + x2) / 2, (y1 + y2) / 2
@@ -154,7 +157,7 @@ class NN:
         cx, cy = mx, my - offset
 
         # Draw on alpha layer
-        layer = py.Surface((world.win_width, world.win_height), py.SRCALPHA)
+        layer = py.Surface(surface.get_size(), py.SRCALPHA)
 
         steps = 18
         prev = (x1, y1)
@@ -165,15 +168,43 @@ class NN:
             py.draw.line(layer, color, prev, (bx, by), thickness)
             prev = (bx, by)
 
-        world.win.blit(layer, (0, 0))
-
-    def draw(self, world):
-        self._draw_panel(world)
+        surface.blit(layer.premul_alpha(), (0, 0), special_flags=py.BLEND_PREMULTIPLIED)
+
+    #screen area covered by the static parts: shadow, panel, curves and labels
+    def _layer_rect(self):
+        panel = self._panel_rect()
+        rect = panel.union(py.Rect(panel.x + 4, panel.y + 4, panel.w + 8, panel.h + 8))
+        for n in self.nodes:
+            rect.union_ip(py.Rect(n.x - NODE_RADIUS - 35, n.y - NODE_RADIUS - 35, 2 * NODE_RADIUS + 70, 2 * NODE_RADIUS + 70))
+            if n.type != MIDDLE:
+                (tw, th) = NODE_FONT.size(n.label)
+                reach = tw + NODE_RADIUS + 5
+                rect.union_ip(py.Rect(n.x - reach, n.y - th, 2 * reach, 2 * th))
+        return rect
+
+    #everything that doesn't depend on the activations, rendered once per genome
+    #on a surface just big enough for it. The layer holds premultiplied alpha so that
+    #stacking the pieces on it looks the same as drawing them on the window
+    def _render_layer(self):
+        rect = self._layer_rect()
+        layer = py.Surface((rect.w, rect.h), py.SRCALPHA)
+        self._draw_panel(layer, rect.x, rect.y)
 
         # Connections first
         for c in self.connections:
-            self._draw_pretty_connection(world, c)
+            self._draw_pretty_connection(layer, c, rect.x, rect.y)
+
+        for node in self.nodes:
+            node.draw_label(layer, rect.x, rect.y)
+
+        self._layer = (layer, rect.topleft)
+
+    def draw(self, world):
+        if self._layer is None:
+            self._render_layer()
+        (layer, pos) = self._layer
+        world.win.blit(layer, pos, special_flags=py.BLEND_PREMULTIPLIED)
 
-        # Nodes on top
+        # Nodes on top, only their colors change from frame to frame
         for node in self.nodes:
             node.draw_node(world)
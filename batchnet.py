@@ -0,0 +1,164 @@
+import numpy as np
+import neat
+
+#numpy versions of neat's activation functions (same clamping as neat.activations)
+VECTOR_ACTIVATIONS = {
+    "sigmoid": lambda z: 1.0 / (1.0 + np.exp(-np.clip(5.0 * z, -60.0, 60.0))),
+    "tanh": lambda z: np.tanh(np.clip(2.5 * z, -60.0, 60.0)),
+    "sin": lambda z: np.sin(np.clip(5.0 * z, -60.0, 60.0)),
+    "gauss": lambda z: np.exp(-5.0 * np.clip(z, -3.4, 3.4) ** 2),
+    "relu": lambda z: np.where(z > 0.0, z, 0.0),
+    "lelu": lambda z: np.where(z > 0.0, z, 0.005 * z),
+    "identity": lambda z: z,
+    "clamped": lambda z: np.clip(z, -1.0, 1.0),
+    "abs": np.abs,
+    "hat": lambda z: np.maximum(0.0, 1 - np.abs(z)),
+    "square": lambda z: z ** 2,
+    "cube": lambda z: z ** 3,
+}
+
+
+#All the feed-forward networks of a generation compiled into flat numpy arrays.
+#Every node of every genome gets a slot in one value vector; nodes are grouped by
+#depth (longest path from the inputs) across the whole population, so a step costs a
+#few array operations per depth layer instead of a python loop per node and car.
+#Rows are the genome positions in the list given to the constructor. When only some
+#rows are asked for (the cars still alive) the layers are cut down to their nodes and
+#links, redone only when the rows change, so a step costs as much as the live rows.
+#Genomes using an activation/aggregation without a numpy version fall back to
+#neat's FeedForwardNetwork, so the outputs always match it.
+class PopulationNet:
+    def __init__(self, genomes, config):
+        gc = config.genome_config
+        act_names = {f: name for name, f in gc.activation_defs.functions.items()}
+        sum_aggregation = gc.aggregation_function_defs.get("sum")
+
+        self.num_inputs = len(gc.input_keys)
+        self.num_outputs = len(gc.output_keys)
+        self.fallback = {}
+
+        size = 0
+        in_cols, out_cols = [], []
+        layers = []         #per depth: list of (col, bias, response, activation, links)
+        for row, g in enumerate(genomes):
+            net = neat.nn.FeedForwardNetwork.create(g, config)
+
+            col = {}
+            depth = {}
+            for k in gc.input_keys:
+                col[k] = size
+                depth[k] = 0
+                size += 1
+            in_cols.append([col[k] for k in gc.input_keys])
+
+            nodes = []
+            supported = True
+            for node, act, agg, bias, response, links in net.node_evals:
+                name = act_names.get(act)
+                if name not in VECTOR_ACTIVATIONS or agg is not sum_aggregation:
+                    supported = False
+                    break
+                for i, _ in links:
+                    #never evaluated by the network: stays 0.0
+                    if i not in col:
+                        col[i] = size
+                        depth[i] = 0
+                        size += 1
+                col[node] = size
+                size += 1
+                depth[node] = 1 + max((depth[i] for i, _ in links), default=0)
+                nodes.append((depth[node], col[node], bias, response, name, [(col[i], w) for i, w in links]))
+
+            if not supported:
+                self.fallback[row] = net
+                out_cols.append([in_cols[-1][0]] * self.num_outputs)
+                continue
+
+            for d, c, bias, response, name, links in nodes:
+                while len(layers) < d:
+                    layers.append([])
+                layers[d - 1].append((c, bias, response, name, links, row))
+
+            for k in gc.output_keys:
+                if k not in col:
+                    col[k] = size
+                    size += 1
+            out_cols.append([col[k] for k in gc.output_keys])
+
+        self.values = np.zeros(size)
+        self.in_cols = np.array(in_cols, dtype=np.intp).reshape(-1, self.num_inputs)
+        self.out_cols = np.array(out_cols, dtype=np.intp).reshape(-1, self.num_outputs)
+
+        #per depth layer: source slots, weights and target (position in the layer) of every link,
+        #and in layer_rows the row of every node and link of the layer
+        self.layers = []
+        self.layer_rows = []
+        for nodes in layers:
+            src, wts, dst, link_rows = [], [], [], []
+            for pos, (_, _, _, _, links, row) in enumerate(nodes):
+                for c, w in links:
+                    src.append(c)
+                    wts.append(w)
+                    dst.append(pos)
+                    link_rows.append(row)
+            groups = {}
+            for pos, (_, _, _, name, _, _) in enumerate(nodes):
+                groups.setdefault(name, []).append(pos)
+            self.layers.append((
+                np.array([n[0] for n in nodes], dtype=np.intp),
+                np.array([n[1] for n in nodes]),
+                np.array([n[2] for n in nodes]),
+                np.array(src, dtype=np.intp),
+                np.array(wts),
+                np.array(dst, dtype=np.intp),
+                [(VECTOR_ACTIVATIONS[name], np.array(pos, dtype=np.intp)) for name, pos in groups.items()],
+            ))
+            self.layer_rows.append((np.array([n[5] for n in nodes], dtype=np.intp), np.array(link_rows, dtype=np.intp)))
+        #rows of the last activation and the layers cut down to them
+        self._rows = None
+        self._live_layers = self.layers
+
+    #the layers restricted to the nodes and links of the given rows
+    def select(self, rows):
+        alive = np.zeros(len(self.in_cols), dtype=bool)
+        alive[rows] = True
+        selected = []
+        for (cols, bias, response, src, wts, dst, groups), (node_rows, link_rows) in zip(self.layers, self.layer_rows):
+            keep = alive[node_rows]
+            if not keep.any():
+                continue
+            links = alive[link_rows]
+            #new position of the kept nodes in the layer
+            pos = np.cumsum(keep) - 1
+            selected.append((
+                cols[keep], bias[keep], response[keep], src[links], wts[links], pos[dst[links]],
+                [(f, pos[p[keep[p]]]) for f, p in groups if keep[p].any()],
+            ))
+        return selected
+
+    #outputs for the given rows (all by default), inputs has one row of inputs per row
+    def activate(self, inputs, rows=None):
+        inputs = np.asarray(inputs, dtype=float).reshape(-1, self.num_inputs)
+        rows = np.arange(len(self.in_cols)) if rows is None else np.asarray(rows, dtype=np.intp)
+
+        if self._rows is None or len(rows) != len(self._rows) or not np.array_equal(rows, self._rows):
+            self._live_layers = self.layers if len(rows) == len(self.in_cols) else self.select(rows)
+            self._rows = rows.copy()
+
+        v = self.values
+        v[self.in_cols[rows]] = inputs
+        for cols, bias, response, src, wts, dst, groups in self._live_layers:
+            s = np.bincount(dst, weights=v[src] * wts, minlength=len(cols))
+            z = bias + response * s
+            if len(groups) == 1:
+                v[cols] = groups[0][0](z)
+            else:
+                for f, pos in groups:
+                    v[cols[pos]] = f(z[pos])
+
+        outputs = v[self.out_cols[rows]]
+        if self.fallback:
+            for k, r in enumerate(rows.tolist()):
+                if r in self.fallback:
+                    outputs[k] = self.fallback[r].activate(inputs[k].tolist())
+        return outputs
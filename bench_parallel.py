@@ -0,0 +1,65 @@
+import os
+import time
+import random
+import argparse
+import neat
+
+import train
+from parallel_eval import ParallelEvaluator
+
+#Generations per minute versus number of workers.
+#Every run starts from the same seed, so they all begin with the same population and roads.
+#Usage: python bench_parallel.py --workers 1 2 4 8 --generations 5
+
+
+def load_config(config_path):
+    return neat.config.Config(
+        neat.DefaultGenome,
+        neat.DefaultReproduction,
+        neat.DefaultSpeciesSet,
+        neat.DefaultStagnation,
+        config_path
+    )
+
+
+def bench(config, workers, generations, seed):
+    random.seed(seed)
+    train.set_road_seed(seed)
+    train.GEN = 0
+    p = neat.Population(config)
+    #no recording: nothing is written to disk and only the evaluation is timed
+    record = train.RECORD_BEST_RUN
+    train.RECORD_BEST_RUN = False
+
+    try:
+        if workers > 1:
+            # pool start-up is not part of the measure
+            with ParallelEvaluator(workers) as evaluator:
+                start = time.perf_counter()
+                p.run(evaluator.evaluate, generations)
+                elapsed = time.perf_counter() - start
+        else:
+            start = time.perf_counter()
+            p.run(train.eval_genomes, generations)
+            elapsed = time.perf_counter() - start
+    finally:
+        train.RECORD_BEST_RUN = record
+    return generations / elapsed * 60
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark parallel genome evaluation")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, os.cpu_count() or 1])
+    parser.add_argument("--generations", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    train.enable_headless()
+    config = load_config(os.path.join(os.path.dirname(__file__), "config_file.txt"))
+
+    print(f"{'workers':>7} | {'gen/min':>8} | speedup")
+    base = None
+    for w in sorted(set(args.workers)):
+        gpm = bench(config, w, args.generations, args.seed)
+        base = base or gpm
+        print(f"{w:7d} | {gpm:8.2f} | {gpm / base:.2f}x")
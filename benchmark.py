@@ -0,0 +1,319 @@
+import os
+import sys
+import json
+import time
+import random
+import platform
+import argparse
+import statistics
+
+# nothing is shown, the drawing benchmarks render to an offscreen display
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+
+import pygame as py
+import neat
+
+import train
+from car import Car, CarBatch
+from road import Road
+from world import World
+from NNdraw import NN
+from config_variables import *
+
+#Timings of the simulation hot paths on fixed seeds.
+#Every benchmark is rebuilt from the same seed before each run, so two runs of the
+#suite time exactly the same work. Results are written as JSON and compared with a
+#baseline (saved with --save-baseline); a benchmark whose median got slower than the
+#threshold is reported as a regression and the exit code is 1.
+#Usage: python benchmark.py [--only road_draw nn_draw] [--repeat 5] [--save-baseline]
+
+BASELINE_FILE = "benchmark_baseline.json"
+THRESHOLD = 0.15            #allowed slowdown of the median before it counts as a regression
+
+BENCHMARKS = {}
+
+
+#registers a benchmark: setup(seed) builds the scenario and returns (run, ops), where
+#run() does ops operations. Only run() is timed, results are per operation.
+def benchmark(name):
+    def register(setup):
+        BENCHMARKS[name] = setup
+        return setup
+    return register
+
+
+def load_config():
+    return neat.config.Config(
+        neat.DefaultGenome,
+        neat.DefaultReproduction,
+        neat.DefaultSpeciesSet,
+        neat.DefaultStagnation,
+        os.path.join(os.path.dirname(os.path.abspath(__file__)), "config_file.txt")
+    )
+
+#world and road of the given seed, with cars spread over the road ahead of the start
+def make_scene(seed, num_cars=20):
+    random.seed(seed)
+    world = World(STARTING_POS, WIN_WIDTH, WIN_HEIGHT)
+    road = Road(world, seed)
+    rng = random.Random(seed)
+    cars = []
+    for k in range(num_cars):
+        (x, y) = road.centerPoints[(k * 3) % road.num_points].tolist()
+        car = Car(x + rng.uniform(-40, 40), y, 0)
+        car.rot = rng.uniform(-30, 30)
+        cars.append(car)
+    return world, road, cars
+
+
+@benchmark("car_get_inputs")
+def bench_get_inputs(seed):
+    world, road, cars = make_scene(seed)
+
+    def run():
+        for car in cars:
+            car.getInputs(world, road)
+    return run, len(cars)
+
+
+@benchmark("car_detect_collision")
+def bench_detect_collision(seed):
+    world, road, cars = make_scene(seed)
+
+    def run():
+        for car in cars:
+            car.detectCollision(road)
+    return run, len(cars)
+
+
+@benchmark("car_move")
+def bench_move(seed):
+    world, road, cars = make_scene(seed)
+    rng = random.Random(seed)
+    commands = [[rng.random() for _ in range(4)] for _ in range(64)]
+    steps = 500
+
+    def run():
+        for t in range(steps):
+            c = commands[t % len(commands)]
+            for car in cars:
+                car.commands = c
+                car.move(road, t)
+    return run, steps * len(cars)
+
+
+#the same steps for the whole batch at once, as in training
+@benchmark("car_batch_move")
+def bench_batch_move(seed):
+    world, road, cars = make_scene(seed)
+    batch = CarBatch(len(cars))
+    for (r, car) in enumerate(cars):
+        (batch.x[r], batch.y[r], batch.rot[r]) = (car.x, car.y, car.rot)
+    rows = batch.living()
+    rng = random.Random(seed)
+    commands = [[rng.random() for _ in range(4)] for _ in range(64)]
+    steps = 500
+
+    def run():
+        for t in range(steps):
+            batch.move(t, rows, [commands[t % len(commands)]] * len(rows))
+    return run, steps * len(cars)
+
+
+@benchmark("road_create_segment")
+def bench_create_segment(seed):
+    world, road, cars = make_scene(seed)
+    count = 200
+
+    def run():
+        for _ in range(count):
+            road.createSegment(road.last_ctrl_point)
+    return run, count
+
+
+#the camera climbs at top speed, so a new segment is needed every SPACING/MAX_VEL steps
+@benchmark("road_update")
+def bench_road_update(seed):
+    world, road, cars = make_scene(seed)
+    steps = 2000
+
+    def run():
+        (x, y) = world.getBestCarPos()
+        for _ in range(steps):
+            y -= MAX_VEL
+            world.updateBestCarPos((x, y))
+            road.update(world)
+    return run, steps
+
+
+@benchmark("road_draw")
+def bench_road_draw(seed):
+    world, road, cars = make_scene(seed)
+    frames = 200
+
+    def run():
+        for _ in range(frames):
+            road.draw(world)
+    return run, frames
+
+
+#steady state: the static layer is built by the first draw, outside the timing
+@benchmark("nn_draw")
+def bench_nn_draw(seed):
+    world, road, cars = make_scene(seed)
+    random.seed(seed)
+    config = load_config()
+    genome = next(iter(neat.Population(config).population.values()))
+    nn = NN(config, genome, (90, 210))
+    world.bestInputs = [0.5] * INPUT_NEURONS
+    world.bestCommands = [1, 0, 1, 0]
+    nn.draw(world)
+    frames = 200
+
+    def run():
+        for _ in range(frames):
+            nn.draw(world)
+    return run, frames
+
+
+#a new best genome: building the visualization and its first draw
+@benchmark("nn_first_draw")
+def bench_nn_first_draw(seed):
+    world, road, cars = make_scene(seed)
+    random.seed(seed)
+    config = load_config()
+    genomes = list(neat.Population(config).population.values())[:20]
+    world.bestInputs = [0.5] * INPUT_NEURONS
+    world.bestCommands = [1, 0, 1, 0]
+
+    def run():
+        for g in genomes:
+            NN(config, g, (90, 210)).draw(world)
+    return run, len(genomes)
+
+
+def setup_generation(seed, headless):
+    random.seed(seed)
+    config = load_config()
+    genomes = list(neat.Population(config).population.items())
+    train.enable_headless(headless)
+    train.set_road_seed(seed)
+    train.GEN = 0
+    #every step is drawn, without the frame cap
+    train.get_pacer().steps_per_frame = 1
+    train.get_pacer().fps = 0
+    #no recording or profiling: nothing is written to disk and only the simulation is timed
+    (record, profiling) = (train.RECORD_BEST_RUN, train.get_profiler().enabled)
+    train.RECORD_BEST_RUN = False
+    train.enable_profiling(False)
+
+    def run():
+        try:
+            train.eval_genomes(genomes, config)
+        finally:
+            train.RECORD_BEST_RUN = record
+            train.enable_profiling(profiling)
+    return run, 1
+
+
+@benchmark("generation_headless")
+def bench_generation_headless(seed):
+    return setup_generation(seed, True)
+
+
+@benchmark("generation_rendered")
+def bench_generation_rendered(seed):
+    return setup_generation(seed, False)
+
+
+#seconds per operation of one benchmark over repeat runs (plus one warm-up run)
+def measure(setup, seed, repeat):
+    times = []
+    for k in range(repeat + 1):
+        run, ops = setup(seed)
+        start = time.perf_counter()
+        run()
+        elapsed = (time.perf_counter() - start) / ops
+        if k > 0:
+            times.append(elapsed)
+    return {
+        "median": statistics.median(times),
+        "mean": statistics.fmean(times),
+        "min": min(times),
+        "max": max(times),
+        "runs": repeat,
+    }
+
+#names of the benchmarks slower than the baseline by more than threshold, with the ratio
+def compare(results, baseline, threshold):
+    regressions = {}
+    for name, res in results.items():
+        base = baseline.get("results", {}).get(name)
+        if base is None:
+            continue
+        ratio = res["median"] / base["median"]
+        if ratio > 1 + threshold:
+            regressions[name] = ratio
+    return regressions
+
+
+def format_time(seconds):
+    for unit, scale in (("s", 1), ("ms", 1e-3), ("us", 1e-6)):
+        if seconds >= scale:
+            return f"{seconds / scale:8.2f} {unit}"
+    return f"{seconds / 1e-9:8.2f} ns"
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the simulation hot paths")
+    parser.add_argument("--only", nargs="+", choices=sorted(BENCHMARKS), help="run only these benchmarks")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default="benchmark_results.json")
+    parser.add_argument("--baseline", default=BASELINE_FILE)
+    parser.add_argument("--threshold", type=float, default=THRESHOLD)
+    parser.add_argument("--save-baseline", action="store_true", help="store these results as the new baseline")
+    args = parser.parse_args()
+
+    py.init()
+    names = args.only or list(BENCHMARKS)
+    results = {}
+    for name in names:
+        results[name] = measure(BENCHMARKS[name], args.seed, args.repeat)
+
+    report = {
+        "meta": {
+            "date": time.strftime("%Y-%m-%d %H:%M:%S"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "pygame": py.version.ver,
+            "seed": args.seed,
+            "repeat": args.repeat,
+        },
+        "results": results,
+    }
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+
+    baseline = None
+    if os.path.exists(args.baseline) and not args.save_baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+    regressions = compare(results, baseline, args.threshold) if baseline else {}
+
+    print(f"{'benchmark':<22} | {'median':>11} | {'min':>11} | vs baseline")
+    for name, res in results.items():
+        line = f"{name:<22} | {format_time(res['median'])} | {format_time(res['min'])} |"
+        base = baseline.get("results", {}).get(name) if baseline else None
+        if base is not None:
+            ratio = res["median"] / base["median"]
+            line += f" {ratio:5.2f}x" + ("  REGRESSION" if name in regressions else "")
+        print(line)
+
+    if args.save_baseline:
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"Baseline saved to {args.baseline}")
+
+    py.quit()
+    sys.exit(1 if regressions else 0)
@@ -0,0 +1,211 @@
+import os
+import sys
+import time
+import queue
+import multiprocessing
+from multiprocessing import shared_memory
+import numpy as np
+import pygame as py
+from config_variables import FPS, CAPTURE_QUEUE
+
+#Frames drawn into an offscreen World saved as a video, without a display.
+#Encoding runs in a separate writer process, so it never holds this process' GIL.
+#capture() copies the finished frame's raw pixels into a free slot of a shared memory
+#ring (converting them to RGB is left to the writer) and sends the slot number to the
+#writer, which hands the slot back as soon as it has read it. When no slot is free the
+#frame is dropped (with a warning) instead of waiting, so training never waits for the
+#disk; with drop=False capture() waits for the writer instead (offline capture, where a
+#complete video matters more than speed).
+#The writer encodes either
+#  - a PNG sequence: <path>/frame-000000.png ... (any path not ending in .y4m)
+#  - a YUV4MPEG2 file (<path>.y4m, 4:4:4): raw video that ffmpeg and most players read,
+#    e.g. ffmpeg -i demo.y4m demo.mp4
+
+#seconds between two warnings about dropped frames
+DROP_WARNING_INTERVAL = 5.0
+
+#draws on a plain surface instead of a window; call before the first World is created.
+#The dummy video driver still provides the display mode that loading the sprites needs
+def use_offscreen_display():
+    os.environ["SDL_VIDEODRIVER"] = "dummy"
+
+
+class FrameCapture:
+    def __init__(self, path, fps=FPS, queue_size=CAPTURE_QUEUE, drop=True):
+        self.path = path
+        self.fps = fps
+        self.drop = drop
+        self.format = "y4m" if path.lower().endswith(".y4m") else "png"
+        self.captured = 0       #frames handed to the writer
+        self.dropped = 0        #frames dropped because the writer was behind
+        self.size = None
+        if self.format == "png":
+            os.makedirs(path, exist_ok=True)
+        elif os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+
+        self.queue_size = queue_size
+        self._shm = None        #the frame slots, created at the first frame
+        self._free = []
+        self._error = None
+        self._last_warning = None
+        #spawned, not forked from a process that has a display open
+        ctx = multiprocessing.get_context("spawn")
+        self._jobs = ctx.Queue()
+        self._done = ctx.Queue()
+        self._process = ctx.Process(target=_writer, args=(path, self.format, fps, self._jobs, self._done), daemon=True)
+        self._process.start()
+
+    #queues the current content of surface, returns False if the frame was dropped
+    def capture(self, surface):
+        self._reclaim()
+        if self._error is not None:
+            raise self._error
+        if self.size is None:
+            self._open(surface)
+        elif surface.get_size() != self.size:
+            raise ValueError(f"frame size {surface.get_size()} differs from the video's {self.size}")
+
+        if not self._free:
+            if self.drop:
+                self.dropped += 1
+                self._warn_dropping()
+                return False
+            self._wait_slot()
+        slot = self._free.pop()
+        n = self._frame_bytes
+        self._shm.buf[slot * n:(slot + 1) * n] = surface.get_buffer() if self._layout else py.image.tobytes(surface, "RGB")
+        self._jobs.put(slot)
+        self.captured += 1
+        return True
+
+    #the frames are sent as the surface's raw pixels when they have 4 bytes (a plain copy),
+    #as packed RGB otherwise
+    def _open(self, surface):
+        self.size = (w, h) = surface.get_size()
+        if surface.get_bytesize() == 4:
+            self._layout = (surface.get_pitch(), surface.get_shifts()[:3])
+            self._frame_bytes = h * surface.get_pitch()
+        else:
+            self._layout = None
+            self._frame_bytes = w * h * 3
+        self._shm = shared_memory.SharedMemory(create=True, size=self._frame_bytes * self.queue_size)
+        self._free = list(range(self.queue_size))
+        self._jobs.put(("open", self._shm.name, self.size, self._layout, self._frame_bytes))
+
+    #slots handed back by the writer, and its error if it had one
+    def _reclaim(self):
+        while True:
+            try:
+                item = self._done.get_nowait()
+            except queue.Empty:
+                return
+            self._receive(item)
+
+    def _receive(self, item):
+        if isinstance(item, int):
+            self._free.append(item)
+        else:
+            self._error = item
+
+    def _wait_slot(self):
+        while not self._free:
+            try:
+                self._receive(self._done.get(timeout=1.0))
+            except queue.Empty:
+                if not self._process.is_alive():
+                    raise RuntimeError("the capture writer process stopped")
+            if self._error is not None:
+                raise self._error
+
+    def _warn_dropping(self):
+        now = time.monotonic()
+        if self._last_warning is None or now - self._last_warning >= DROP_WARNING_INTERVAL:
+            self._last_warning = now
+            print(f"WARNING: capture to {self.path} is dropping frames, the writer can't keep up "
+                  f"({self.dropped} of {self.captured + self.dropped} dropped so far)", file=sys.stderr)
+
+    #writes the frames still queued and stops the writer
+    def close(self):
+        if self._process.is_alive():
+            self._jobs.put(None)
+            self._process.join()
+        self._reclaim()
+        if self._shm is not None:
+            self._shm.close()
+            self._shm.unlink()
+            self._shm = None
+        if self._error is not None:
+            raise self._error
+
+    def summary(self):
+        where = self.path if self.format == "y4m" else os.path.join(self.path, "frame-*.png")
+        return f"Captured {self.captured} frames to {where} ({self.dropped} dropped)"
+
+
+#writer process: reads the frame of every slot it is sent, hands the slot back and encodes
+#the frame. After an error the frames are only read, the error is sent back once
+def _writer(path, fmt, fps, jobs, done):
+    if hasattr(os, "nice"):
+        #the simulation comes first when they share a core
+        os.nice(10)
+    shm = None
+    out = None
+    n = 0
+    failed = False
+    try:
+        while True:
+            job = jobs.get()
+            if job is None:
+                return
+            if isinstance(job, tuple):
+                (_, name, size, layout, frame_bytes) = job
+                shm = shared_memory.SharedMemory(name=name, track=False)
+                continue
+            data = bytes(shm.buf[job * frame_bytes:(job + 1) * frame_bytes])
+            done.put(job)
+            if failed:
+                continue
+            try:
+                if layout is not None:
+                    data = raw_to_rgb(data, size, *layout)
+                if fmt == "png":
+                    frame = py.image.frombytes(data, size, "RGB")
+                    py.image.save(frame, os.path.join(path, f"frame-{n:06d}.png"))
+                else:
+                    if out is None:
+                        (w, h) = size
+                        out = open(path, "wb")
+                        out.write(f"YUV4MPEG2 W{w} H{h} F{fps}:1 Ip A1:1 C444\n".encode("ascii"))
+                    out.write(b"FRAME\n")
+                    out.write(rgb_to_yuv444(data, size))
+                n += 1
+            except Exception as e:
+                failed = True
+                done.put(e)
+    finally:
+        if out is not None:
+            out.close()
+        if shm is not None:
+            shm.close()
+
+
+#packed RGB bytes of the raw pixels of a (w, h) 32 bit surface, given its pitch (bytes
+#per line) and the bit shifts of its red, green and blue channels
+def raw_to_rgb(data, size, pitch, shifts):
+    (w, h) = size
+    pixels = np.frombuffer(data, dtype=np.uint8).reshape(h, pitch)[:, :w * 4].reshape(h, w, 4)
+    channels = [s // 8 if sys.byteorder == "little" else 3 - s // 8 for s in shifts]
+    return pixels[:, :, channels].tobytes()
+
+
+#packed RGB bytes of a (w, h) frame as the planar Y, Cb, Cr bytes of a 4:4:4 y4m frame
+#(limited range BT.601, 8 bit integer coefficients)
+def rgb_to_yuv444(data, size):
+    (w, h) = size
+    (r, g, b) = np.frombuffer(data, dtype=np.uint8).reshape(h * w, 3).T.astype(np.int32)
+    yuv = np.empty((3, h * w), dtype=np.uint8)
+    yuv[0] = ((66 * r + 129 * g + 25 * b + 128) >> 8) + 16
+    yuv[1] = ((-38 * r - 74 * g + 112 * b + 128) >> 8) + 128
+    yuv[2] = ((112 * r - 94 * g - 18 * b + 128) >> 8) + 128
+    return yuv.tobytes()
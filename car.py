@@ -1,20 +1,105 @@
 from config_variables import *
 import pygame as py
-import os
 from math import *
 from random import random
 from road import *
 import numpy as np
 from vect2d import vect2d
 import world
+from collision import getCollisions
+from sensors import castSensors, getSensorBorders
+from sprites import getSprite, CAR_IMGS, BRAKE_IMG
+
+
+#CarBatch.state columns
+STATE_COLUMNS = ("x", "y", "rot", "vel", "acc")
+VEL = STATE_COLUMNS.index("vel")
+
+#the decoded commands of a car as a number, one bit per command, and what Car.move
+#does for each number: acceleration (braking wins, as its test comes last) and the
+#change of rotation (turning both ways can't be decoded, it is listed as no turn)
+COMMAND_BITS = 1 << np.arange(4)
+ACC_BY_CODE = np.array([-BRAKE_STREGHT if code & COMMAND_BITS[BRAKE] else
+                        ACC_STRENGHT if code & COMMAND_BITS[ACC] else FRICTION for code in range(16)])
+TURN_BY_CODE = np.array([-TURN_VEL if code & COMMAND_BITS[TURN_LEFT] and not code & COMMAND_BITS[TURN_RIGHT] else
+                         TURN_VEL if code & COMMAND_BITS[TURN_RIGHT] and not code & COMMAND_BITS[TURN_LEFT] else
+                         0.0 for code in range(16)])
+
+
+#State of many cars in numpy arrays, one row per car: position, rotation (degrees),
+#velocity, acceleration and the last network outputs. move() steps the rows it is
+#given at once with the same arithmetic as Car.move; dead cars are masked out of
+#alive, nothing is removed, so a row keeps its index (and network) for the whole run.
+#x, y, rot, vel and acc are columns of one state matrix, so a step gathers and
+#scatters the rows once.
+class CarBatch:
+    def __init__(self, n):
+        self.state = np.zeros((n, len(STATE_COLUMNS)))
+        self.state[:, VEL] = MAX_VEL/2
+        (self.x, self.y, self.rot, self.vel, self.acc) = self.state.T
+        self.commands = np.zeros((n, 4))
+        self.alive = np.ones(n, dtype=bool)
+
+    def __len__(self):
+        return len(self.state)
+
+    #indices of the cars still running
+    def living(self):
+        return np.flatnonzero(self.alive)
+
+    def kill(self, rows):
+        self.alive[rows] = False
+
+    #one step of the cars in rows (all of them by default), with commands when given
+    #(one row of network outputs per car) or the stored ones
+    def move(self, t, rows=None, commands=None):
+        if rows is None:
+            rows = np.arange(len(self))
+        if commands is None:
+            commands = self.commands.take(rows, axis=0)
+        else:
+            self.commands[rows] = commands
+        code = decodeCommands(commands).dot(COMMAND_BITS)
 
+        timeBuffer = 500
+        if MAX_VEL_REDUCTION == 1 or t >= timeBuffer:
+            max_vel_local = MAX_VEL
+        else:
+            ratio = MAX_VEL_REDUCTION + (1 - MAX_VEL_REDUCTION)*(t/timeBuffer)
+            max_vel_local = MAX_VEL *ratio
 
-class Car:
-    x = 0
-    y = 0       #coordinate in world space for the car
+        s = self.state.take(rows, axis=0)
+        (x, y, rot, vel, acc) = s.T
+        acc[:] = ACC_BY_CODE.take(code)
+        rot += TURN_BY_CODE.take(code)
+        vel[:] = np.maximum(np.minimum(vel + acc, max_vel_local), 0)
+        angle = np.radians(rot)
+        x += vel * np.sin(angle)
+        y -= vel * np.cos(angle)
+        self.state[rows] = s
+
+
+#read/write access to one field of the car's batch row
+def _batchField(name):
+    def get(self):
+        return float(getattr(self.batch, name)[self.row])
+    def set(self, value):
+        getattr(self.batch, name)[self.row] = value
+    return property(get, set)
 
 
-    def __init__(self, x, y, turn):
+#A car as a view onto one row of a CarBatch (coordinates in world space), used to
+#draw it. A car made on its own gets a batch of one.
+class Car:
+    x = _batchField("x")
+    y = _batchField("y")
+    rot = _batchField("rot")
+    vel = _batchField("vel")
+    acc = _batchField("acc")
+
+    def __init__(self, x, y, turn, batch=None, row=0):
+        self.batch = CarBatch(1) if batch is None else batch
+        self.row = row
         self.x = x
         self.y = y
         self.rot = turn
@@ -24,40 +109,23 @@ class Car:
         self.initImgs()
         self.commands = [0,0,0,0]
 
-    def initImgs(self):
-        img_names = ["yellow_car.png", "red_car.png", "blu_car.png", "green_car.png"]
-        name = img_names[floor(random()*len(img_names)) % len(img_names)]
-
-        # Load at native resolution
-        self.base_img = py.image.load(os.path.join("imgs", name)).convert_alpha()
-        self.base_brake = py.image.load(os.path.join("imgs", "brakes.png")).convert_alpha()
+    @property
+    def commands(self):
+        return self.batch.commands[self.row].tolist()
 
-        # size for car png(can be tuned for better quality/performance)
-        self.sprite_size = (160, 92)  
+    @commands.setter
+    def commands(self, value):
+        self.batch.commands[self.row] = value
 
-        # High quality downscale/upscale
-        self.img = py.transform.smoothscale(self.base_img, self.sprite_size)
-        self.brake_img = py.transform.smoothscale(self.base_brake, self.sprite_size)
-
-        #rotation because of stupid png orientation
-        self.img = py.transform.rotate(self.img, -90)
-        self.brake_img = py.transform.rotate(self.brake_img, -90)
+    def initImgs(self):
+        #only references to the shared atlas, images are loaded once per process
+        name = CAR_IMGS[floor(random()*len(CAR_IMGS)) % len(CAR_IMGS)]
+        self.sprite = getSprite(name)
+        self.brake_sprite = getSprite(BRAKE_IMG)
 
     #important method- detects collision between car and road
     def detectCollision(self, road):
-        #get mask
-        mask = py.mask.from_surface(self.img)
-        (width, height) = mask.get_size()
-        for v in [road.pointsLeft, road.pointsRight]:
-            for p in v:
-                x = p.x - self.x + width/2
-                y = p.y - self.y + height/2
-                try:
-                    if mask.get_at((int(x),int(y))):
-                        return True
-                except IndexError as error:
-                    continue
-        return False
+        return bool(getCollisions([self], road)[0])
 
     def getInputs(self, world, road):         
         sensors = []
@@ -67,10 +135,10 @@ class Car:
 
         for v in [road.pointsLeft, road.pointsRight]:
             i = road.bottomPointIndex
-            while v[i].y > self.y - SENSOR_DISTANCE:
-                next_index = getPoint(i+1, NUM_POINTS*road.num_ctrl_points)
+            while v[i, 1] > self.y - SENSOR_DISTANCE:
+                next_index = getPoint(i+1, road.num_points)
 
-                getDistance(world, self, sensors, sensorsEquations, v[i], v[next_index])
+                getDistance(world, self, sensors, sensorsEquations, vect2d(*v[i]), vect2d(*v[next_index]))
                 i = next_index
 
         if CAR_DBG:
@@ -92,15 +160,7 @@ class Car:
         #Draws the 8 sensor rays for THIS car using the actual measured distances.
         #draws the rays for the best car so far.
         # Recompute raw distances (0..SENSOR_DISTANCE)
-        sensors = [SENSOR_DISTANCE for _ in range(8)]
-        sensorsEquations = getSensorEquations(self, world)
-
-        for v in [road.pointsLeft, road.pointsRight]:
-            i = road.bottomPointIndex
-            while v[i].y > self.y - SENSOR_DISTANCE:
-                next_index = getPoint(i+1, NUM_POINTS*road.num_ctrl_points)
-                getDistance(world, self, sensors, sensorsEquations, v[i], v[next_index])
-                i = next_index
+        sensors = castSensors([self.x], [self.y], [self.rot], getSensorBorders(road, [self.y]))[0].tolist()
 
         # Draw rays + hit points
         origin = world.getScreenCoords(self.x, self.y)
@@ -146,16 +206,14 @@ class Car:
         return (self.x, self.y)
 
     def draw(self, world):
-        screen_position = world.getScreenCoords(self.x, self.y)
+        (sx, sy) = world.getScreenCoords(self.x, self.y)
+
+        (rotated_img, (ox, oy)) = self.sprite.rotated(self.rot)
+        world.win.blit(rotated_img, (sx - ox, sy - oy))
 
-        rotated_img = py.transform.rotate(self.img, -self.rot)
-        new_rect = rotated_img.get_rect(center=screen_position)
-        world.win.blit(rotated_img, new_rect.topleft)
-        
         if decodeCommand(self.commands, BRAKE):
-            rotated_brake = py.transform.rotate(self.brake_img, -self.rot)
-            brake_rect = rotated_brake.get_rect(center=screen_position)
-            world.win.blit(rotated_brake, brake_rect.topleft)
+            (rotated_brake, (ox, oy)) = self.brake_sprite.rotated(self.rot)
+            world.win.blit(rotated_brake, (sx - ox, sy - oy))
 
 
     #======================== LOCAL FUNCTIONS ==========================
@@ -213,6 +271,16 @@ def getDistance(world, car, sensors, sensorsEquations, p, q):
         if dist < sensors[index]:
             sensors[index] = dist
 
+#the command each command competes with (accelerate/brake, left/right), by command index
+OPPOSITE_COMMANDS = np.zeros(4, dtype=int)
+OPPOSITE_COMMANDS[[ACC, BRAKE, TURN_LEFT, TURN_RIGHT]] = [BRAKE, ACC, TURN_RIGHT, TURN_LEFT]
+
+#decodeCommand of every command of a (n_cars, 4) array of outputs at once, as a bool
+#array of the same shape (column ACC = accelerates...)
+def decodeCommands(commands):
+    c = np.asarray(commands, dtype=float)
+    return (c > ACTIVATION_TRESHOLD) & (c > c.take(OPPOSITE_COMMANDS, axis=1))
+
 def decodeCommand(commands, type):
     if commands[type] > ACTIVATION_TRESHOLD:
         if type == ACC and commands[type] > commands[BRAKE]:
@@ -0,0 +1,185 @@
+import os
+import re
+import gzip
+import pickle
+import queue
+import random
+import threading
+from itertools import count
+import neat
+
+#Full training state (population, species, innovation tracker, random state and
+#our own counters) saved every few generations so a long run can be resumed.
+#A checkpoint named <prefix><N>.gz resumes at the start of generation N, like
+#neat.Checkpointer's. The state is pickled on the training thread, so the snapshot
+#is consistent, while compressing and writing happen on a background thread.
+
+
+class AsyncCheckpointer(neat.Checkpointer):
+    #state() returns a picklable dict saved along the population (GEN, road seed...)
+    #keep = number of its most recent checkpoints left on disk, None keeps all of them
+    def __init__(self, directory, generation_interval, time_interval_seconds=None, keep=3,
+                 prefix="checkpoint-", state=None, compresslevel=5):
+        super().__init__(generation_interval, time_interval_seconds, os.path.join(directory, prefix))
+        self.directory = directory
+        self.prefix = prefix
+        self.keep = keep
+        self.state = state
+        self.compresslevel = compresslevel
+        os.makedirs(directory, exist_ok=True)
+        #checkpoints written by this checkpointer, oldest first: only those are pruned, the
+        #ones of other runs in the same directory are left alone
+        self._written = []
+
+        self._jobs = queue.Queue(maxsize=2)
+        self._error = None
+        self._thread = threading.Thread(target=self._writer, daemon=True)
+        self._thread.start()
+
+    def save_checkpoint(self, config, population, species_set, generation):
+        if self._error is not None:
+            raise self._error
+        extra = self.state() if self.state is not None else {}
+        data = (generation, config, population, species_set, random.getstate(), extra)
+        #the species set references all the reporters (statistics history, this
+        #checkpointer...), the restored population gets its own ones anyway
+        reporters = species_set.reporters
+        species_set.reporters = None
+        #pickling the genome config draws the next node id from its counter, it is
+        #put back so that saving a checkpoint doesn't change the run
+        gc = config.genome_config
+        next_node = None
+        if gc.node_indexer is not None:
+            next_node = next(gc.node_indexer)
+            gc.node_indexer = count(next_node)
+        try:
+            raw = pickle.dumps(data, protocol=pickle.HIGHEST_PROTOCOL)
+        finally:
+            species_set.reporters = reporters
+            if next_node is not None:
+                gc.node_indexer = count(next_node)
+        print(f"Saving checkpoint to {self.filename_prefix}{generation}.gz")
+        #blocks only if two checkpoints are still waiting to be written
+        self._jobs.put((f"{self.filename_prefix}{generation}.gz", raw))
+
+    def _writer(self):
+        while True:
+            job = self._jobs.get()
+            try:
+                if job is None:
+                    return
+                (path, raw) = job
+                write_atomic(path, gzip.compress(raw, compresslevel=self.compresslevel))
+                if path in self._written:
+                    self._written.remove(path)
+                self._written.append(path)
+                self._prune()
+            except Exception as e:
+                self._error = e
+            finally:
+                self._jobs.task_done()
+
+    def _prune(self):
+        if self.keep is None:
+            return
+        while len(self._written) > self.keep:
+            path = self._written.pop(0)
+            if os.path.exists(path):
+                os.remove(path)
+
+    #waits for the pending writes, the checkpointer can't be used afterwards
+    def close(self):
+        if self._thread.is_alive():
+            self._jobs.put(None)
+            self._thread.join()
+        if self._error is not None:
+            raise self._error
+
+
+#Writes files on a background thread. When several contents of the same path are
+#waiting only the newest one is written, so a slow disk never holds up training.
+class BackgroundFileWriter:
+    def __init__(self):
+        self._pending = {}
+        self._closed = False
+        self._error = None
+        self._cond = threading.Condition()
+        self._thread = threading.Thread(target=self._writer, daemon=True)
+        self._thread.start()
+
+    def write(self, path, data):
+        if self._error is not None:
+            raise self._error
+        with self._cond:
+            self._pending[path] = data
+            self._cond.notify()
+
+    def _writer(self):
+        while True:
+            with self._cond:
+                while not self._pending and not self._closed:
+                    self._cond.wait()
+                if not self._pending:
+                    return
+                (path, data) = self._pending.popitem()
+            try:
+                write_atomic(path, data)
+            except Exception as e:
+                self._error = e
+
+    #writes what is still pending and stops the thread
+    def close(self):
+        with self._cond:
+            self._closed = True
+            self._cond.notify()
+        self._thread.join()
+        if self._error is not None:
+            raise self._error
+
+
+#a crash while writing never leaves a truncated file behind
+def write_atomic(path, data):
+    tmp = path + ".tmp"
+    with open(tmp, "wb") as f:
+        f.write(data)
+    os.replace(tmp, path)
+
+
+#checkpoint files of a directory, oldest first by write time (a directory can hold the
+#checkpoints of several runs, the generation numbers don't tell which is the latest)
+def list_checkpoints(directory, prefix="checkpoint-"):
+    if not os.path.isdir(directory):
+        return []
+    pattern = re.compile(re.escape(prefix) + r"(\d+)\.gz$")
+    found = []
+    for name in os.listdir(directory):
+        m = pattern.match(name)
+        if m:
+            path = os.path.join(directory, name)
+            found.append((os.path.getmtime(path), int(m.group(1)), path))
+    return [path for _, _, path in sorted(found)]
+
+
+def latest_checkpoint(directory, prefix="checkpoint-"):
+    paths = list_checkpoints(directory, prefix)
+    return paths[-1] if paths else None
+
+#population saved by AsyncCheckpointer, ready to run from the saved generation,
+#and the saved state dict. config replaces the saved one (the innovation tracker
+#is carried over like in neat.Checkpointer.restore_checkpoint, and so is the node
+#id counter, otherwise new nodes could reuse the ids of existing ones)
+def restore_checkpoint(path, config=None):
+    with gzip.open(path) as f:
+        generation, saved_config, population, species_set, rndstate, extra = pickle.load(f)
+
+    tracker = getattr(saved_config.genome_config, "innovation_tracker", None)
+    if config is None:
+        config = saved_config
+    config.genome_config.node_indexer = saved_config.genome_config.node_indexer
+    p = neat.Population(config, (population, species_set, generation))
+    if tracker is not None:
+        p.reproduction.innovation_tracker = tracker
+        config.genome_config.innovation_tracker = tracker
+    #after creating the population, which may seed random from the config
+    random.setstate(rndstate)
+    return p, extra
@@ -0,0 +1,74 @@
+from config_variables import *
+import numpy as np
+
+HALF_WIDTH = CAR_HITBOX[0]/2
+HALF_LENGTH = CAR_HITBOX[1]/2
+#radius of the circle around the hitbox, used to pick the nearby segments
+REACH = (HALF_WIDTH**2 + HALF_LENGTH**2)**0.5
+
+
+#collision of every car's rotated hitbox with the road borders, returns a bool per car.
+#xs, ys, rots are per car, borders is a list of (n_points, 2) polylines, usually only
+#the segments near the cars (see getCollisions).
+def detectCollisions(xs, ys, rots, borders):
+    xs = np.asarray(xs, dtype=float)
+    ys = np.asarray(ys, dtype=float)
+    rots = np.radians(np.asarray(rots, dtype=float))
+    crashed = np.zeros(len(xs), dtype=bool)
+    if len(xs) == 0:
+        return crashed
+
+    #car axes: u points to the right of the car, v points forward
+    ux, uy = np.cos(rots)[:, None], np.sin(rots)[:, None]
+    vx, vy = np.sin(rots)[:, None], -np.cos(rots)[:, None]
+    cx, cy = xs[:, None], ys[:, None]
+
+    for v in borders:
+        if len(v) < 2:
+            continue
+        p = v[:-1]
+        f = v[1:]
+
+        #segment ends in car space, shape (n_cars, n_segments)
+        px, py = p[None, :, 0] - cx, p[None, :, 1] - cy
+        fx, fy = f[None, :, 0] - cx, f[None, :, 1] - cy
+        u0 = px*ux + py*uy
+        v0 = px*vx + py*vy
+        du = (fx*ux + fy*uy) - u0
+        dv = (fx*vx + fy*vy) - v0
+
+        #clip the segment against the box slabs (Liang-Barsky)
+        t_in = np.zeros_like(u0)
+        t_out = np.ones_like(u0)
+        inside = np.ones(u0.shape, dtype=bool)
+        for d, q in ((-du, u0 + HALF_WIDTH), (du, HALF_WIDTH - u0),
+                     (-dv, v0 + HALF_LENGTH), (dv, HALF_LENGTH - v0)):
+            parallel = d == 0
+            inside &= ~(parallel & (q < 0))
+            with np.errstate(divide="ignore", invalid="ignore"):
+                t = q/d
+            t_in = np.where(~parallel & (d < 0), np.maximum(t_in, t), t_in)
+            t_out = np.where(~parallel & (d > 0), np.minimum(t_out, t), t_out)
+
+        crashed |= (inside & (t_in <= t_out)).any(axis=1)
+
+    return crashed
+
+#collision flags for a list of cars against the current road
+def getCollisions(cars, road):
+    xs = [car.x for car in cars]
+    ys = [car.y for car in cars]
+    rots = [car.rot for car in cars]
+    if len(cars) == 0:
+        return np.zeros(0, dtype=bool)
+    #only the segments that can reach one of the cars
+    borders = road.borderSegments(min(ys) - REACH, max(ys) + REACH)
+    return detectCollisions(xs, ys, rots, borders)
+
+#collision flags for the rows of a CarBatch
+def getBatchCollisions(batch, rows, road):
+    if len(rows) == 0:
+        return np.zeros(0, dtype=bool)
+    ys = batch.y[rows]
+    borders = road.borderSegments(ys.min() - REACH, ys.max() + REACH)
+    return detectCollisions(batch.x[rows], ys, batch.rot[rows], borders)
@@ -9,6 +9,17 @@ WIN_HEIGHT = 800
 STARTING_POS = (WIN_WIDTH/2, WIN_HEIGHT-100)
 SCORE_VEL_MULTIPLIER = 0.00                     #bonus for faster cars
 BAD_GENOME_TRESHOLD = 200                       #if a car is too far behind it is removed
+HEADLESS = False                                #train without window, frame cap and drawing (main.py --headless)
+WORKERS = 1                                     #processes evaluating genomes in parallel (main.py --workers)
+SIM_STEPS_PER_FRAME = 1                         #simulation steps per displayed frame, 0 = unlimited (keys 1-4 while running)
+RENDER_EVERY_N_GENERATIONS = 1                  #draw only every n-th generation, the others run without drawing
+
+#episode termination, besides crashing, falling behind, going backward and stopping
+MAX_STEPS = None                                #simulation steps per generation, None = no limit
+MAX_SECONDS = None                              #wall-clock budget of a generation in seconds, None = no limit
+NO_PROGRESS_STEPS = None                        #a car that didn't advance NO_PROGRESS_DISTANCE in that many steps is removed
+NO_PROGRESS_DISTANCE = 100
+STOP_AT_FITNESS_THRESHOLD = True                #end the generation once a genome reaches fitness_threshold (config_file.txt)
 
 INPUT_NEURONS = 9
 OUTPUT_NEURONS = 4
@@ -23,6 +34,7 @@ ACC_STRENGHT = 0.2
 BRAKE_STREGHT = 1
 TURN_VEL = 2
 SENSOR_DISTANCE = 200
+CAR_HITBOX = (88, 155)             #width, length of the car body used for collisions
 ACTIVATION_TRESHOLD = 0.5
 
 #=================== Road Specs ==================================
@@ -35,6 +47,12 @@ SPACING = 220
 NUM_POINTS  = 15                #number of points for each segment
 SAFE_SPACE = SPACING + 50       #buffer space above the screen
 
+ROAD_SEED = None                #base seed of the roads, None picks one per run (main.py --seed)
+ROAD_SEED_PER_GENERATION = True #new road every generation (seed + generation), False keeps one road
+TRACKS_PER_GENOME = 1           #every genome drives this many tracks per generation
+TRACK_REDUCER = "mean"          #fitness over the tracks: mean, min, max, median or a percentile like p25
+TRACK_PRECOMPUTE_SEGMENTS = 50  #segments of each track generated before the generation starts
+
 #=================== Display and Colors ==================================
 
 NODE_RADIUS = 20
@@ -67,8 +85,12 @@ SHOW_BEST_RAYS = True
 # If True, draw best car with a subtle highlight so you can spot it
 HIGHLIGHT_BEST_CAR = True
 
+# Angular resolution (degrees) of the cached car sprite rotations
+SPRITE_ROTATION_STEP = 2
+
 # HUD tuning
 HUD_FONT = py.font.SysFont("consolas", 22)
+TEXT_CACHE_SIZE = 256   # rendered overlay strings kept in memory (least recently used dropped)
 
 # Road / scene visuals
 DRAW_CENTER_LINE = True
@@ -76,6 +98,31 @@ DRAW_ROAD_FILL = True
 
 # Report file name (generation summaries)
 REPORT_FILE = "report.txt"
+
+# Metrics stream, one record per generation (.jsonl or .csv, see metrics.load_metrics)
+METRICS_FILE = "metrics.jsonl"
+METRICS_FLUSH_RECORDS = 50      # report and metrics lines are written out every that many lines...
+METRICS_FLUSH_SECONDS = 30      # ...or after that many seconds
+
+# Best run of every generation saved for replays (python play.py --replay)
+RECORD_BEST_RUN = True
+RECORD_DIR = "recordings"
+
+# Offscreen frame capture to a .y4m video or a directory of PNGs (main.py / play.py --capture)
+CAPTURE_QUEUE = 8               # frames waiting for the writer process in shared memory (~3.5 MB each), further ones are dropped in training
+CAPTURE_MAX_FRAMES = 1800       # play.py stops capturing after that many frames
+
+# Per-phase timing of the training loop (main.py --profile), shown in the report and on the HUD
+PROFILE = False
+PROFILE_HUD = True
+
+# Checkpoints of the whole population for resuming long runs (main.py --resume)
+CHECKPOINT_DIR = "checkpoints"
+CHECKPOINT_EVERY = 25           # generations between checkpoints, None = only by time
+CHECKPOINT_SECONDS = 600        # at the latest after this many seconds, None = only by generations
+CHECKPOINT_KEEP = 3             # most recent checkpoints kept on disk
+
+# Camera
 CAMERA_TARGET_Y = 0.78   # car sits at 78% of screen height (more road ahead)
 CAMERA_SMOOTHING = 0.15  # 0..1, higher = snappier camera
 
@@ -1,12 +1,42 @@
 import os
+import argparse
 import train
+from checkpoint import latest_checkpoint
+from config_variables import HEADLESS, WORKERS, ROAD_SEED, PROFILE, CHECKPOINT_DIR
 
 WINNER_FILE = "winner_genome.pkl"
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Train the self-driving car with NEAT")
+    parser.add_argument("--headless", action="store_true", default=HEADLESS,
+                        help="simulate without a window, frame cap or drawing")
+    parser.add_argument("--workers", type=int, default=WORKERS,
+                        help="evaluate genomes on this many processes (implies --headless)")
+    parser.add_argument("--seed", type=int, default=ROAD_SEED,
+                        help="base seed of the roads, the same seed gives the same tracks")
+    parser.add_argument("--generations", type=int, default=10000,
+                        help="total number of generations, resumed runs included")
+    parser.add_argument("--resume", nargs="?", const="latest", metavar="CHECKPOINT",
+                        help=f"continue from a checkpoint, the most recently written one in {CHECKPOINT_DIR}/ by default")
+    parser.add_argument("--profile", action="store_true", default=PROFILE,
+                        help="time every phase of the training loop (report.txt columns and HUD)")
+    parser.add_argument("--capture", metavar="PATH",
+                        help="draw offscreen and save the drawn generations as a .y4m video or PNGs in the PATH directory")
+    args = parser.parse_args()
+    if args.capture and (args.headless or args.workers > 1):
+        parser.error("--capture needs the generations to be drawn, it can't be used with --headless or --workers")
+
     local_dir = os.path.dirname(__file__)
     config_path = os.path.join(local_dir, "config_file.txt")
     winner_path = os.path.join(local_dir, WINNER_FILE)
 
-    train.run_training(config_path, winner_path=winner_path, generations=10000)
+    resume = args.resume
+    if resume == "latest":
+        resume = latest_checkpoint(CHECKPOINT_DIR)
+        if resume is None:
+            parser.error(f"no checkpoint found in {CHECKPOINT_DIR}/")
+
+    train.run_training(config_path, winner_path=winner_path, generations=args.generations,
+                       headless=args.headless, workers=args.workers, seed=args.seed,
+                       profile=args.profile, resume=resume, capture=args.capture)
     print(f"Training done. Best genome saved to: {winner_path}")
@@ -0,0 +1,188 @@
+import os
+import csv
+import json
+import time
+import threading
+import numpy as np
+import neat
+
+#fitness percentiles of every record
+PERCENTILES = (10, 25, 50, 75, 90)
+
+
+#Text file kept open for the whole run. Lines are buffered and written out when
+#flush_records lines are pending or, at the latest, flush_seconds after the previous
+#write out (a timer thread does it when no new line comes, e.g. during a long
+#generation), so a crash loses at most that much.
+class LogFile:
+    def __init__(self, path, mode="w", flush_records=50, flush_seconds=30.0):
+        self.path = path
+        self.flush_records = flush_records
+        self.flush_seconds = flush_seconds
+        self._file = open(path, mode, encoding="utf-8", newline="")
+        self._pending = 0
+        self._last_flush = time.monotonic()
+        self._lock = threading.Lock()
+        self._timer = None
+
+    def write(self, text):
+        with self._lock:
+            self._file.write(text)
+            self._pending += 1
+            wait = self._last_flush + self.flush_seconds - time.monotonic()
+            if self._pending >= self.flush_records or wait <= 0:
+                self._flush()
+            elif self._timer is None:
+                self._timer = threading.Timer(wait, self._flush_due)
+                self._timer.daemon = True
+                self._timer.start()
+
+    def flush(self):
+        with self._lock:
+            self._flush()
+
+    def _flush(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        if not self._file.closed:
+            self._file.flush()
+        self._pending = 0
+        self._last_flush = time.monotonic()
+
+    #timer thread: writes out the lines still pending
+    def _flush_due(self):
+        with self._lock:
+            self._timer = None
+            if self._pending:
+                self._flush()
+
+    def close(self):
+        with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+            if not self._file.closed:
+                self._file.close()
+
+
+#One record per generation in a JSONL (.jsonl) or CSV (.csv) file:
+#generation, wall (seconds since the start), generation_time (since the previous
+#record), eval_time, evals, evals_per_sec, best/mean/std/min fitness, the fitness
+#percentiles, species count and sizes (a ";" separated list in CSV), plus the
+#fields of extra() if given (e.g. the loop profile).
+#With append (resumed runs) the records continue the existing file: wall goes on from
+#its last record and a CSV keeps its columns (fields that aren't one of them are left out).
+class MetricsReporter(neat.reporting.BaseReporter):
+    def __init__(self, path, flush_records=50, flush_seconds=30.0, append=False, extra=None):
+        self.csv = path.endswith(".csv")
+        self.extra = extra
+        (fields, last) = read_existing(path, self.csv) if append and os.path.exists(path) else (None, None)
+        self.log = LogFile(path, "a" if append else "w", flush_records, flush_seconds)
+        self._writer = None
+        self._fields = fields
+        self.generation = 0
+        self._start = self._last = time.perf_counter()
+        self._eval_start = self._start
+        #wall time of the previous part of a resumed run
+        self._wall_offset = float(last["wall"]) if last and last.get("wall") not in (None, "") else 0.0
+
+    def start_generation(self, generation):
+        self.generation = generation
+        self._eval_start = time.perf_counter()
+
+    def post_evaluate(self, config, population, species_set, best_genome):
+        now = time.perf_counter()
+        fits = np.array([g.fitness for g in population.values() if g.fitness is not None], dtype=float)
+        sizes = [len(s.members) for s in species_set.species.values()]
+        eval_time = now - self._eval_start
+
+        record = {
+            "generation": self.generation,
+            "wall": self._wall_offset + now - self._start,
+            "generation_time": now - self._last,
+            "eval_time": eval_time,
+            "evals": len(population),
+            "evals_per_sec": len(population) / eval_time if eval_time > 0 else 0.0,
+            "best": float(fits.max()) if len(fits) else float("nan"),
+            "mean": float(fits.mean()) if len(fits) else float("nan"),
+            "std": float(fits.std()) if len(fits) else float("nan"),
+            "min": float(fits.min()) if len(fits) else float("nan"),
+        }
+        for q, v in zip(PERCENTILES, np.percentile(fits, PERCENTILES) if len(fits) else [float("nan")] * len(PERCENTILES)):
+            record[f"p{q}"] = float(v)
+        record["species"] = len(sizes)
+        record["species_sizes"] = sizes
+        if self.extra is not None:
+            record.update(self.extra() or {})
+        self._last = now
+        self.write(record)
+
+    def write(self, record):
+        if not self.csv:
+            self.log.write(json.dumps(record) + "\n")
+            return
+        row = dict(record, species_sizes=";".join(str(s) for s in record["species_sizes"]))
+        if self._writer is None:
+            self._writer = csv.DictWriter(self.log, fieldnames=self._fields or list(row), extrasaction="ignore")
+            if self._fields is None:
+                self._writer.writeheader()
+            else:
+                dropped = [k for k in row if k not in self._fields]
+                if dropped:
+                    print(f"{self.log.path}: columns {', '.join(dropped)} are not in the existing file and are not written")
+        self._writer.writerow(row)
+
+    def close(self):
+        self.log.close()
+
+
+#columns (CSV, None for JSONL) and last complete record of an existing metrics file
+def read_existing(path, is_csv):
+    with open(path, encoding="utf-8", newline="") as f:
+        if is_csv:
+            reader = csv.DictReader(f)
+            last = None
+            for last in reader:
+                pass
+            return reader.fieldnames, last
+        last = None
+        for line in f:
+            try:
+                last = json.loads(line)
+            except ValueError:
+                #a line cut short by a crash
+                continue
+        return None, last
+
+
+#metrics file as numpy arrays, one per field (species_sizes stays a list of arrays,
+#text fields are string arrays)
+def load_metrics(path):
+    with open(path, encoding="utf-8", newline="") as f:
+        if path.endswith(".csv"):
+            records = list(csv.DictReader(f))
+            for r in records:
+                r["species_sizes"] = [int(s) for s in r["species_sizes"].split(";") if s]
+        else:
+            records = [json.loads(line) for line in f if line.strip()]
+
+    columns = {}
+    for r in records:
+        for k in r:
+            columns.setdefault(k, [])
+    for k, values in columns.items():
+        values.extend(r.get(k) for r in records)
+
+    arrays = {}
+    for k, values in columns.items():
+        if k == "species_sizes":
+            arrays[k] = [np.array(v, dtype=int) for v in values]
+            continue
+        try:
+            arrays[k] = np.array([float("nan") if v in (None, "") else float(v) for v in values])
+        except ValueError:
+            #text fields (e.g. ended_by)
+            arrays[k] = np.array(["" if v is None else v for v in values])
+    arrays["generation"] = arrays["generation"].astype(int)
+    return arrays
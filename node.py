@@ -19,10 +19,14 @@ class Node:
         py.draw.circle(world.win, colorScheme[0], (self.x,self.y), NODE_RADIUS)
         py.draw.circle(world.win, colorScheme[1], (self.x,self.y), NODE_RADIUS-2)
 
-        #draw labels
+    #labels never change, they are drawn once on the cached (premultiplied) layer of NN at origin ox, oy
+    def draw_label(self, surface, ox=0, oy=0):
         if self.type != MIDDLE:
             text = NODE_FONT.render(self.label, 1, BLACK)
-            world.win.blit(text, (self.x + (self.type-1) * ((text.get_width() if not self.type else 0) + NODE_RADIUS + 5), self.y - text.get_height()/2))
+            #same pixel format as the layer, which premultiplied blits don't convert
+            label = py.Surface(text.get_size(), py.SRCALPHA)
+            label.blit(text, (0, 0))
+            surface.blit(label.premul_alpha(), (self.x - ox + (self.type-1) * ((text.get_width() if not self.type else 0) + NODE_RADIUS + 5), self.y - oy - text.get_height()/2), special_flags=py.BLEND_PREMULTIPLIED)
 
     def getNodeColors(self, world):
 
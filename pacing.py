@@ -0,0 +1,58 @@
+import time
+import pygame as py
+from config_variables import FPS, SIM_STEPS_PER_FRAME
+
+#runtime speed keys: simulation steps per displayed frame, 0 = unlimited
+SPEED_KEYS = {py.K_1: 1, py.K_2: 4, py.K_3: 16, py.K_4: 0}
+
+#how often the window is still serviced when nothing is drawn (seconds)
+EVENT_INTERVAL = 0.1
+
+
+#Decouples the simulation from the display: the loop calls step() after every
+#simulation step and only draws when it returns True.
+#With steps_per_frame = n the display runs at FPS showing every n-th step, with 0
+#(unlimited) the simulation runs flat out and a frame is shown every 1/FPS seconds.
+class FramePacer:
+    def __init__(self, steps_per_frame=SIM_STEPS_PER_FRAME, fps=FPS):
+        self.steps_per_frame = steps_per_frame
+        self.fps = fps          #frame cap, 0 = none (benchmarks)
+        self.clock = py.time.Clock()
+        self.pending = 0
+        self.last_frame = time.perf_counter()
+        self.last_events = self.last_frame
+
+    #True when a frame should be drawn after this simulation step
+    def step(self):
+        self.pending += 1
+        if self.steps_per_frame:
+            return self.pending >= self.steps_per_frame
+        return time.perf_counter() - self.last_frame >= 1 / (self.fps or FPS)
+
+    #to call once the frame is on screen, waits for the frame cap if there is one
+    def frame_done(self):
+        self.pending = 0
+        if self.steps_per_frame:
+            self.clock.tick(self.fps)
+        self.last_frame = self.last_events = time.perf_counter()
+
+    #True when a loop that doesn't draw should still poll the window events
+    def events_due(self):
+        now = time.perf_counter()
+        if now - self.last_events >= EVENT_INTERVAL:
+            self.last_events = now
+            return True
+        return False
+
+    #applies the speed keys, returns False when the window was closed
+    def handle_events(self):
+        for event in py.event.get():
+            if event.type == py.QUIT:
+                return False
+            if event.type == py.KEYDOWN and event.key in SPEED_KEYS:
+                self.steps_per_frame = SPEED_KEYS[event.key]
+                self.pending = 0
+        return True
+
+    def label(self):
+        return f"{self.steps_per_frame}x" if self.steps_per_frame else "unlimited"
@@ -0,0 +1,69 @@
+from multiprocessing import Pool
+
+import train
+
+
+#every worker simulates headless, set before any display is opened
+def _init_worker():
+    train.enable_headless()
+
+#simulate one chunk of genomes on one track in a worker and send back their fitness and the episode summary
+def _eval_chunk(args):
+    genomes, config, track, record, (deadline, max_steps) = args
+    episode = train.simulate(genomes, config, track, record=record, deadline=deadline, max_steps=max_steps)
+    return [g.fitness for _, g in genomes], episode
+
+
+#Spreads the genomes of a generation over a pool of worker processes.
+#Each chunk of genomes is simulated together in a worker, headless, on each of the
+#generation's tracks (the same for every chunk), the fitness is reduced over the tracks.
+#The generation's step and time budget is shared like in eval_genomes: every chunk of a
+#track gets the track's share, as the chunks run side by side.
+#Cars only compete with cars of their own chunk (the camera follows the best car of
+#the chunk), so chunk_size changes the dynamics a bit: one chunk is the serial eval_genomes.
+class ParallelEvaluator:
+    def __init__(self, num_workers, chunk_size=None):
+        self.num_workers = num_workers
+        self.chunk_size = chunk_size
+        self.pool = Pool(processes=num_workers, initializer=_init_worker)
+
+    def evaluate(self, genomes, config):
+        train.GEN += 1
+        #sent to every worker with their geometry, so all the chunks drive the same roads
+        tracks = train.make_tracks(train.GEN)
+
+        size = self.chunk_size or -(-len(genomes) // self.num_workers)
+        chunks = [genomes[i:i + size] for i in range(0, len(genomes), size)]
+        #the runs are recorded on the first track, the best genome's is saved once the fitness is reduced
+        budgets = train.track_budgets(len(tracks))
+        jobs = [(chunk, config, track, train.RECORD_BEST_RUN and k == 0, budgets[k])
+                for k, track in enumerate(tracks) for chunk in chunks]
+
+        # assign the reduced fitness back to each genome
+        scores = {key: [] for key, _ in genomes}
+        episodes = []
+        for (chunk, _, _, _, _), (fits, episode) in zip(jobs, self.pool.map(_eval_chunk, jobs)):
+            for (key, _), fitness in zip(chunk, fits):
+                scores[key].append(fitness)
+            episodes.append(episode)
+        for key, g in genomes:
+            g.fitness = train.reduce_fitness(scores[key])
+        #the jobs go track by track
+        train._last_episode = train.merge_episodes(
+            [episodes[k * len(chunks):(k + 1) * len(chunks)] for k in range(len(tracks))])
+        run = train.best_run(genomes, [e["recording"] for e in episodes if "recording" in e])
+        if run is not None:
+            train.save_best_run(train.GEN, run)
+
+    def close(self):
+        if self.pool is not None:
+            self.pool.close()
+            self.pool.join()
+            self.pool = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+        return False
@@ -1,11 +1,14 @@
 import os
 import pickle
+import argparse
 import pygame as py
 import neat
 
 from car import Car
 from road import Road
-from world import World
+from textcache import render_text, get_panel
+from pacing import FramePacer
+from recording import load_run, latest_run
 from config_variables import *
 
 import train  # reuse draw_win()
@@ -23,15 +26,11 @@ def load_config(config_path):
     )
 
 
-def _draw_badge_top_left(win):
-    font = py.font.SysFont("consolas", 22, bold=True)
-    text = "BEST MODEL SO FAR"
-    surf = font.render(text, True, (15, 15, 15))
+def _draw_badge_top_left(win, text="BEST MODEL SO FAR"):
+    surf = render_text(text, "consolas", 22, (15, 15, 15), bold=True)
 
     pad_x, pad_y = 12, 8
-    box = py.Surface((surf.get_width() + 2 * pad_x, surf.get_height() + 2 * pad_y), py.SRCALPHA)
-    box.fill((255, 255, 255, 190))
-    py.draw.rect(box, (40, 40, 40, 80), box.get_rect(), 1, border_radius=10)
+    box = get_panel((surf.get_width() + 2 * pad_x, surf.get_height() + 2 * pad_y), (255, 255, 255, 190), (40, 40, 40, 80), 10)
 
     win.blit(box, (12, 12))
     win.blit(surf, (12 + pad_x, 12 + pad_y))
@@ -42,19 +41,13 @@ def _draw_controls_from_outputs(win, outputs):
     Visualize the model outputs directly (no color changes).
     Improved spacing to prevent label/value overlap.
     """
-    font_title = py.font.SysFont("consolas", 18, bold=True)
-    font_label = py.font.SysFont("consolas", 16)
-    font_val = py.font.SysFont("consolas", 14)
-
     x0, y0 = 12, 70
     w, h = 230, 158  # slightly bigger panel to fit padding better
 
-    panel = py.Surface((w, h), py.SRCALPHA)
-    panel.fill((255, 255, 255, 170))
-    py.draw.rect(panel, (40, 40, 40, 90), panel.get_rect(), 1, border_radius=10)
+    panel = get_panel((w, h), (255, 255, 255, 170), (40, 40, 40, 90), 10)
     win.blit(panel, (x0, y0))
 
-    title = font_title.render("MODEL OUTPUTS", True, (20, 20, 20))
+    title = render_text("MODEL OUTPUTS", "consolas", 18, (20, 20, 20), bold=True)
     win.blit(title, (x0 + 14, y0 + 10))
 
     border_col = (40, 40, 40, 120)
@@ -72,17 +65,15 @@ def _draw_controls_from_outputs(win, outputs):
         pad_l = 10
         pad_r = 10
 
-        box = py.Surface((bw, bh), py.SRCALPHA)
-        box.fill((255, 255, 255, 210))
-        py.draw.rect(box, border_col, box.get_rect(), 1, border_radius=8)
+        box = get_panel((bw, bh), (255, 255, 255, 210), border_col, 8)
         win.blit(box, (x, y))
 
         # Label (top-left inside tile)
-        label_surf = font_label.render(label, True, text_col)
+        label_surf = render_text(label, "consolas", 16, text_col)
         win.blit(label_surf, (x + pad_l, y + 7))
 
         # Value (bottom-right inside tile)
-        val_surf = font_val.render(f"{float(value):+.2f}", True, text_col)
+        val_surf = render_text(f"{float(value):+.2f}", "consolas", 14, text_col)
         win.blit(val_surf, (x + bw - pad_r - val_surf.get_width(), y + bh - 8 - val_surf.get_height()))
 
     bx = x0 + 14
@@ -96,11 +87,64 @@ def _draw_controls_from_outputs(win, outputs):
     draw_tile(labels[3], outs[3], bx + 100 + gap_x, by + 44 + gap_y)
 
     if isinstance(outputs, (list, tuple)) and len(outputs) > 4:
-        extra = font_val.render(f"({len(outputs)} outputs)", True, (60, 60, 60))
+        extra = render_text(f"({len(outputs)} outputs)", "consolas", 14, (60, 60, 60))
         win.blit(extra, (x0 + 14, y0 + h - 24))
 
 
-def run_demo():
+#shared loop of the demo and the replay: step(world, road, car, t) moves the car for
+#step t (1, 2...) and returns False once the run is over, the last frame then stays on
+#screen until the window is closed. The steps are paced by a FramePacer, every frame shows
+#badge and the car's commands over the scene (gen, score: shown by draw_win).
+#capture = path of a video (.y4m) or PNG directory: the frames are drawn offscreen,
+#without dropping any, and the capture stops with the run or after max_frames frames
+def _play(step, seed=None, gen=0, badge="BEST MODEL SO FAR", score=None,
+          capture=None, max_frames=CAPTURE_MAX_FRAMES):
+    pacer = FramePacer()
+    if capture is not None:
+        #every frame is written, as fast as the writer goes
+        train.enable_capture(capture, drop=False)
+        pacer.fps = 0
+    world = train.make_world()
+    road = Road(world, seed)
+    if score is not None:
+        world.updateScore(score)
+
+    car = Car(0, 0, 0)
+    cars = [car]
+
+    t = 0
+    frames = 0
+    playing = True
+    run_loop = True
+    while run_loop:
+        if playing:
+            t += 1
+            playing = step(world, road, car, t)
+        if not playing and capture is not None:
+            break
+
+        if pacer.step():
+            run_loop = pacer.handle_events()
+
+            # overlays go on top before the frame is shown, so no display update in draw_win
+            train.draw_win(cars, road, world, gen=gen, speed=pacer.label(), update=False)
+            _draw_badge_top_left(world.win, badge)
+            _draw_controls_from_outputs(world.win, car.commands)
+
+            train.show_frame(world)
+            pacer.frame_done()
+            frames += 1
+            if capture is not None and frames >= max_frames:
+                run_loop = False
+        elif pacer.events_due():
+            run_loop = pacer.handle_events()
+
+    train.close_capture()
+    py.quit()
+
+
+#drives the best saved model on a new road (see _play for capture and max_frames)
+def run_demo(capture=None, max_frames=CAPTURE_MAX_FRAMES):
     py.font.init()
 
     local_dir = os.path.dirname(__file__)
@@ -116,31 +160,11 @@ def run_demo():
 
     net = neat.nn.FeedForwardNetwork.create(genome, config)
 
-    world = World(STARTING_POS, WIN_WIDTH, WIN_HEIGHT)
-    road = Road(world)
-    clock = py.time.Clock()
-
-    car = Car(0, 0, 0)
-    cars = [car]
-
-    world.bestCar = car
-    world.updateBestCarPos((car.x, car.y))
-
-    t = 0
-    run_loop = True
-    while run_loop:
-        t += 1
-        clock.tick(FPS)
-
-        for event in py.event.get():
-            if event.type == py.QUIT:
-                run_loop = False
-
+    def step(world, road, car, t):
         inp = car.getInputs(world, road)
         inp.append(car.vel / MAX_VEL)
 
-        out = net.activate(tuple(inp))
-        car.commands = out
+        car.commands = net.activate(tuple(inp))
         car.move(road, t)
 
         world.bestCar = car
@@ -151,20 +175,46 @@ def run_demo():
             world.updateBestCarPos((bx, by))
 
         road.update(world)
+        return True
 
-        # This shit Prevents double-update flicker (because main.draw_win calls display.update internally.Pygame is shit)
-        _orig_update = py.display.update
-        py.display.update = lambda *args, **kwargs: None
-        train.draw_win(cars, road, world, gen=0)
-        py.display.update = _orig_update
+    _play(step, capture=capture, max_frames=max_frames)
 
-        _draw_badge_top_left(world.win)
-        _draw_controls_from_outputs(world.win, out)
 
-        py.display.flip()
+#redraws a run recorded during training (recording.py): the car is placed at each recorded
+#state on the road rebuilt from the recorded seed, nothing is simulated.
+#With capture the replay is drawn offscreen (see _play) and stops at the end of the run
+def run_replay(path, capture=None, max_frames=CAPTURE_MAX_FRAMES):
+    (steps, meta) = load_run(path)
 
-    py.quit()
+    def step(world, road, car, t):
+        if t > len(steps):
+            return False
+        (car.x, car.y, car.rot, car.vel, *commands) = steps[t - 1].tolist()
+        car.commands = commands
+
+        bx, by = world.getBestCarPos()
+        world.updateBestCarPos((car.x, car.y) if car.y < by else (bx, by))
+        road.update(world)
+        return True
+
+    _play(step, meta["seed"], meta["generation"], f"REPLAY GEN {meta['generation']}", meta["fitness"],
+          capture, max_frames)
 
 
 if __name__ == "__main__":
-    run_demo()
+    parser = argparse.ArgumentParser(description="Drive the best saved model, or replay a recorded run")
+    parser.add_argument("--replay", nargs="?", const="latest", metavar="RUN",
+                        help=f"replay a run recorded in training (.npy), the latest one in {RECORD_DIR}/ by default")
+    parser.add_argument("--capture", metavar="PATH",
+                        help="draw offscreen and save the frames as a .y4m video or PNGs in the PATH directory")
+    parser.add_argument("--frames", type=int, default=CAPTURE_MAX_FRAMES,
+                        help="frames to capture at most, of the demo or the replay")
+    args = parser.parse_args()
+
+    if args.replay is None:
+        run_demo(args.capture, args.frames)
+    else:
+        path = latest_run(RECORD_DIR) if args.replay == "latest" else args.replay
+        if path is None:
+            parser.error(f"no recording found in {RECORD_DIR}/")
+        run_replay(path, args.capture, args.frames)
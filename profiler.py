@@ -0,0 +1,85 @@
+import time
+from collections import deque
+
+#phases of a simulation step, in the order they run
+PHASES = ("setup", "sensing", "activation", "physics", "collision", "bookkeeping", "road", "events", "drawing", "wait")
+
+
+#Wall time spent in each phase of the training loop, aggregated per generation.
+#The loop calls lap(phase) at the end of every phase: the time since the previous
+#lap is charged to that phase, so a step costs one perf_counter per phase.
+#When profiling is off the loop gets NULL_PROFILER instead, whose methods do nothing.
+class PhaseProfiler:
+    enabled = True
+
+    #keep = number of most recent generation profiles kept in history
+    def __init__(self, keep=1000):
+        self.history = deque(maxlen=keep)      #one profile per finished generation, see end()
+        self.begin(0)
+
+    #starts the aggregation of a new generation
+    def begin(self, generation):
+        self.generation = generation
+        self.totals = dict.fromkeys(PHASES, 0.0)
+        self.steps = 0
+        self.car_steps = 0
+        self.start = self._last = time.perf_counter()
+
+    def lap(self, phase):
+        now = time.perf_counter()
+        self.totals[phase] += now - self._last
+        self._last = now
+
+    #one simulation step of n cars
+    def count(self, n):
+        self.steps += 1
+        self.car_steps += n
+
+    #profile of the generation so far:
+    #{"generation", "wall", "steps", "car_steps", "steps_per_sec", "car_steps_per_sec", "phases": {phase: seconds}}
+    def snapshot(self):
+        wall = time.perf_counter() - self.start
+        return {
+            "generation": self.generation,
+            "wall": wall,
+            "steps": self.steps,
+            "car_steps": self.car_steps,
+            "steps_per_sec": self.steps / wall if wall > 0 else 0.0,
+            "car_steps_per_sec": self.car_steps / wall if wall > 0 else 0.0,
+            "phases": dict(self.totals),
+        }
+
+    #closes the generation, its profile is returned and kept in history
+    def end(self):
+        profile = self.snapshot()
+        self.history.append(profile)
+        return profile
+
+    #profile of the last finished generation, None before the first one
+    def last(self):
+        return self.history[-1] if self.history else None
+
+
+class NullProfiler:
+    enabled = False
+
+    def begin(self, generation):
+        pass
+
+    def lap(self, phase):
+        pass
+
+    def count(self, n):
+        pass
+
+    def end(self):
+        return None
+
+
+NULL_PROFILER = NullProfiler()
+
+
+#share of the generation's wall time spent in each phase, in percent
+def phase_shares(profile):
+    wall = profile["wall"]
+    return {p: 100.0 * s / wall if wall > 0 else 0.0 for p, s in profile["phases"].items()}
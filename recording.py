@@ -0,0 +1,80 @@
+import io
+import os
+import re
+import json
+import numpy as np
+
+#Runs recorded during training: one float32 row per simulation step holding the car
+#state after the step and the network outputs that produced it, plus a JSON sidecar
+#with the seed of the road and where the run comes from. A replay only needs these
+#two files, no network, sensors or physics.
+COLUMNS = ("x", "y", "rot", "vel", "c0", "c1", "c2", "c3")
+
+
+#collects the trajectory of every row (car) of a simulation: every step copies the whole
+#car.CarBatch state and commands into preallocated float32 buffers (steps, rows, ...),
+#doubled in length when a run outgrows them. Plain copies of the whole batch are cheaper
+#than picking the running rows; rows only ever leave, so a row's trajectory is its first
+#length[row] steps and is only put together when asked for
+class RunRecorder:
+    def __init__(self, num_rows, capacity=256):
+        self.num_rows = num_rows
+        self.states = np.zeros((capacity, num_rows, 5), dtype=np.float32)
+        self.commands = np.zeros((capacity, num_rows, 4), dtype=np.float32)
+        self.length = np.zeros(num_rows, dtype=int)
+        self.steps = 0
+
+    #state of the batch after a step, rows are the ones still running
+    def record(self, rows, batch):
+        if self.steps == len(self.states):
+            self.states = np.concatenate((self.states, np.zeros_like(self.states)))
+            self.commands = np.concatenate((self.commands, np.zeros_like(self.commands)))
+        self.states[self.steps] = batch.state
+        self.commands[self.steps] = batch.commands
+        self.steps += 1
+        self.length[rows] = self.steps
+
+    #drops the unused part of the buffers (before sending the recorder to another process)
+    def trim(self):
+        self.states = self.states[:self.steps]
+        self.commands = self.commands[:self.steps]
+
+    #(steps, len(COLUMNS)) float32 array of one row
+    def trajectory(self, row):
+        n = self.length[row]
+        #x, y, rot, vel are the first columns of the batch state
+        return np.concatenate((self.states[:n, row, :4], self.commands[:n, row]), axis=1)
+
+
+def run_path(directory, generation):
+    return os.path.join(directory, f"gen-{generation:05d}.npy")
+
+#saves a run as <path> (.npy) and its sidecar, through writer (a checkpoint.BackgroundFileWriter)
+#when given so that training doesn't wait for the disk
+def save_run(path, trajectory, meta, writer=None):
+    buf = io.BytesIO()
+    np.save(buf, trajectory)
+    files = [(path, buf.getvalue()), (meta_path(path), json.dumps(meta).encode("utf-8"))]
+    for (p, data) in files:
+        if writer is not None:
+            writer.write(p, data)
+        else:
+            with open(p, "wb") as f:
+                f.write(data)
+
+#memory-mapped trajectory of a saved run and its sidecar dict
+def load_run(path):
+    with open(meta_path(path), encoding="utf-8") as f:
+        meta = json.load(f)
+    return np.load(path, mmap_mode="r"), meta
+
+
+def meta_path(path):
+    return os.path.splitext(path)[0] + ".json"
+
+#most recent recording of a directory, None if there is none
+def latest_run(directory):
+    if not os.path.isdir(directory):
+        return None
+    runs = sorted(name for name in os.listdir(directory) if re.match(r"gen-\d+\.npy$", name))
+    return os.path.join(directory, runs[-1]) if runs else None
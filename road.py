@@ -1,37 +1,73 @@
 from config_variables import *
 import pygame as py
 import numpy as np
-from scipy import interpolate
 from math import *
 from vect2d import *
-from random import random, seed
+from random import Random
+
+#length of the dashes of the center line
+DASH_LEN = 12
+
+#The center line of a segment is the cubic through its two control points with the given
+#slopes dx/dy at both ends (a two point CubicSpline with clamped ends), in closed form.
+#t of its points in driving order, from just above the bottom control point (t = 1, the
+#last point of the previous segment) up to the top one (t = 0), and the Hermite basis
+#at those t: x = HERMITE_BASIS @ (x_top, SPACING*slope_top, x_bottom, SPACING*slope_bottom)
+SEGMENT_STEPS = np.arange(NUM_POINTS)[::-1]
+_t = SEGMENT_STEPS / NUM_POINTS
+HERMITE_BASIS = np.column_stack((2*_t**3 - 3*_t**2 + 1, _t**3 - 2*_t**2 + _t, -2*_t**3 + 3*_t**2, _t**3 - _t**2))
 
 class Road:
-    def __init__(self, world):
+    #the same seed always builds the same road, None picks a random one.
+    #seed can also be a random.Random, the road then draws from it, or a Track whose
+    #precomputed segments are copied instead of generated
+    def __init__(self, world, seed=None):
+        self.track = None
+        self.rng = None
+        if isinstance(seed, Track):
+            self.track = seed
+            seed = seed.seed
+        elif isinstance(seed, Random):
+            self.rng = seed
+            seed = None
+        else:
+            seed = newSeed() if seed is None else seed
+            self.rng = Random(seed)
+        #seed that rebuilds this road, None when it draws from a given Random
+        self.seed = seed
+        self.segments_made = 0
         self.num_ctrl_points = (int)((world.win_height+SAFE_SPACE)/SPACING)+2
 
         self.last_ctrl_point = 0
         self.ctrl_points = []
-        self.centerPoints = []
-        self.pointsLeft = []
-        self.pointsRight = []
+        self.num_points = NUM_POINTS*self.num_ctrl_points
+
+        #ring buffers of (x, y) rows for the center line and the borders, indexed
+        #with getPoint. Every point is stored twice (at i and i+num_points) so any
+        #window of the ring is a contiguous slice, see window()
+        self._center = np.full((2*self.num_points, 2), 1000.0)
+        self._left = np.full((2*self.num_points, 2), 1000.0)
+        self._right = np.full((2*self.num_points, 2), 1000.0)
+        self.centerPoints = self._center[:self.num_points]
+        self.pointsLeft = self._left[:self.num_points]
+        self.pointsRight = self._right[:self.num_points]
+        self.leftIndex = SegmentIndex(self.num_points)
+        self.rightIndex = SegmentIndex(self.num_points)
+        self.centerIndex = SegmentIndex(self.num_points)
+        #center line dash starting at each point (ax, ay, bx, by), mirrored like the points
+        self._dashes = np.full((2*self.num_points, 4), 1000.0)
 
         for i in range(self.num_ctrl_points):
              self.ctrl_points.append(vect2d())
 
-        for i in range(NUM_POINTS*self.num_ctrl_points):        
-            self.pointsLeft.append(vect2d(1000,1000))
-            self.pointsRight.append(vect2d(1000,1000))
-            self.centerPoints.append(vect2d(1000,1000))
-
         self.ctrl_points[0].co(0, SPACING)              
         self.ctrl_points[1].co(0, 0)
-        for i in range(NUM_POINTS):
-            x = self.ctrl_points[0].x
-            y = self.ctrl_points[0].y - SPACING/NUM_POINTS*i
-            self.centerPoints[i].co(x, y)
-            self.pointsLeft[i].co(x - ROAD_WIDTH/2, y)
-            self.pointsRight[i].co(x + ROAD_WIDTH/2, y)
+        for (i, (x, y)) in enumerate(startPoints()):
+            self.setCenter(i, x, y)
+            self.setPoint(self._left, i, x - ROAD_WIDTH/2, y)
+            self.setPoint(self._right, i, x + ROAD_WIDTH/2, y)
+            self.leftIndex.update(i, y)
+            self.rightIndex.update(i, y)
         self.next_point = NUM_POINTS
 
         for i in range(self.num_ctrl_points-2):
@@ -40,53 +76,66 @@ class Road:
         self.last_ctrl_point = self.num_ctrl_points-1
         self.bottomPointIndex = 0
 
-    def calcBorders(self, i):
-        prev_index = getPoint(i-1, self.num_ctrl_points*NUM_POINTS)
-        center = self.centerPoints[i]
-        prev = self.centerPoints[prev_index]
-        angle = atan2(center.x-prev.x, prev.y-center.y)
+    #writes point i of a ring buffer (both copies)
+    def setPoint(self, buffer, i, x, y):
+        buffer[i] = buffer[i+self.num_points] = (x, y)
 
-        x = ROAD_WIDTH/2 * cos(angle)
-        y = ROAD_WIDTH/2 * sin(angle)
-        self.pointsLeft[i].x = center.x - x
-        self.pointsLeft[i].y = center.y - y if not center.y - y >= self.pointsLeft[prev_index].y else self.pointsLeft[prev_index].y
-        self.pointsRight[i].x = center.x + x
-        self.pointsRight[i].y = center.y + y if not center.y + y >= self.pointsRight[prev_index].y else self.pointsRight[prev_index].y
+    #writes center point i, indexes it and caches the dash of the point before it
+    def setCenter(self, i, x, y):
+        self.setPoint(self._center, i, x, y)
+        self.centerIndex.update(i, y)
+        #no dash until the next point exists
+        self._dashes[i] = self._dashes[i+self.num_points] = (x, y, x, y)
 
-    def createSegment(self, index):
-        p1 = self.ctrl_points[getPoint(index, self.num_ctrl_points)]
-        p2 = self.ctrl_points[getPoint(index+1, self.num_ctrl_points)]
+        prev = getPoint(i-1, self.num_points)
+        (px, py) = self.centerPoints[prev].tolist()
+        dx = x - px
+        dy = y - py
+        dist = (dx*dx + dy*dy) ** 0.5
+        if dist > 0:
+            l = min(DASH_LEN, dist)
+            self._dashes[prev] = self._dashes[prev+self.num_points] = (px, py, px + dx/dist*l, py + dy/dist*l)
 
-        #define p2
-        seed()
-        # Lateral movement with a soft clamp (prevents huge kinks)
-        dx = (random() - 0.5) * MAX_DEVIATION
-        p2.co(p1.x + dx, p1.y - SPACING)
+    #zero-copy views (center, left, right) of count points in ring order from index start,
+    #by default the whole ring from the oldest (lowest) point to the newest one
+    def window(self, start=None, count=None):
+        start = self.bottomPointIndex if start is None else getPoint(start, self.num_points)
+        end = start + (self.num_points if count is None else min(count, self.num_points))
+        return (self._center[start:end], self._left[start:end], self._right[start:end])
 
-        # Smooth the target tangent angle using previous angle (low-pass filter)
-        prev_ang = getattr(p1, "angle", 0.0)
+    #left and right border polylines (views) holding every segment that overlaps
+    #the world-y range [y_min, y_max], found by binary search in the segment indexes
+    def borderSegments(self, y_min, y_max):
+        borders = []
+        for (points, index) in ((self._left, self.leftIndex), (self._right, self.rightIndex)):
+            (lo, hi) = index.query(self.bottomPointIndex, y_min, y_max)
+            start = self.bottomPointIndex + lo
+            borders.append(points[start:start + hi - lo + 1])
+        return borders
 
-        target = (random() - 0.5) * MAX_ANGLE
-        smooth = 0.85  # closer to 1.0 = smoother, less variation
-        p2.angle = smooth * prev_ang + (1.0 - smooth) * target
-
-        y_tmp = []
-        for i in range(NUM_POINTS):
-            y_tmp.append(p2.y+SPACING/NUM_POINTS*i)
+    def createSegment(self, index):
+        p1 = self.ctrl_points[getPoint(index, self.num_ctrl_points)]
+        p2 = self.ctrl_points[getPoint(index+1, self.num_ctrl_points)]
 
-        #get cubic spline of the center line of the road
-        ny = np.array([p2.y, p1.y]) 
-        nx = np.array([p2.x, p1.x])
-        cs = interpolate.CubicSpline(ny, nx, axis=0, bc_type=((1,p2.angle),(1,p1.angle)))
-        res = cs(y_tmp)
+        if self.track is not None:
+            (ctrl, center, left, right) = self.track.segment(self.segments_made)
+        else:
+            prev = getPoint(self.next_point-1, self.num_points)
+            (ctrl, center, left, right) = makeSegment(
+                self.rng, (p1.x, p1.y, getattr(p1, "angle", 0.0)),
+                self.centerPoints[prev].tolist(), self.pointsLeft[prev, 1], self.pointsRight[prev, 1])
+        self.segments_made += 1
+        p2.co(ctrl[0], ctrl[1])
+        p2.angle = ctrl[2]
 
-        #create the actual borders
         for i in range(NUM_POINTS):
-            self.centerPoints[self.next_point].x = res[NUM_POINTS-i-1]
-            self.centerPoints[self.next_point].y = y_tmp[NUM_POINTS-i-1]
-            self.calcBorders(self.next_point)
+            self.setCenter(self.next_point, center[i, 0], center[i, 1])
+            self.setPoint(self._left, self.next_point, left[i, 0], left[i, 1])
+            self.setPoint(self._right, self.next_point, right[i, 0], right[i, 1])
+            self.leftIndex.update(self.next_point, left[i, 1])
+            self.rightIndex.update(self.next_point, right[i, 1])
 
-            self.next_point = getPoint(self.next_point+1, NUM_POINTS*self.num_ctrl_points)
+            self.next_point = getPoint(self.next_point+1, self.num_points)
 
         self.last_ctrl_point = getPoint(self.last_ctrl_point+1, self.num_ctrl_points)
         self.bottomPointIndex = self.next_point
@@ -96,64 +145,132 @@ class Road:
             self.createSegment(self.last_ctrl_point)
 
     def draw(self, world):
+        #only the part of the ring on (or just around) the screen, transformed at once
+        (y_min, y_max) = world.getVisibleRange(SAFE_SPACE)
+        (left, right) = self.borderSegments(y_min, y_max)
+        left = world.getScreenCoordsArray(left).tolist()
+        right = world.getScreenCoordsArray(right).tolist()
+
         if(ROAD_DBG):
-            for i in range(len(self.pointsLeft)):
-                py.draw.circle(world.win, BLUE, world.getScreenCoords(self.pointsLeft[i].x, self.pointsLeft[i].y), 2)
-                py.draw.circle(world.win, BLUE, world.getScreenCoords(self.pointsRight[i].x, self.pointsRight[i].y), 2)
+            for p in left + right:
+                py.draw.circle(world.win, BLUE, p, 2)
         else:
             # add some good looking road dividing lines(dashed obv)
-            if DRAW_ROAD_FILL:
-                poly = []
-                # use only points that are on/near screen to avoid huge polygons
-                for i in range(len(self.pointsLeft)):
-                    p = self.pointsLeft[i]
-                    sp = world.getScreenCoords(p.x, p.y)
-                    if -SAFE_SPACE <= sp[1] <= world.win_height + SAFE_SPACE:
-                        poly.append(sp)
-                for i in range(len(self.pointsRight)-1, -1, -1):
-                    p = self.pointsRight[i]
-                    sp = world.getScreenCoords(p.x, p.y)
-                    if -SAFE_SPACE <= sp[1] <= world.win_height + SAFE_SPACE:
-                        poly.append(sp)
-                if len(poly) >= 3:
-                    py.draw.polygon(world.win, (235, 235, 235), poly)
+            if DRAW_ROAD_FILL and len(left) + len(right) >= 3:
+                py.draw.polygon(world.win, (235, 235, 235), left + right[::-1])
 
             # draw borders
-            for i in range(len(self.pointsLeft)):
-                next_index = getPoint(i+1, NUM_POINTS*self.num_ctrl_points)
+            if len(left) >= 2:
+                py.draw.lines(world.win, BLACK, False, left, 4)
+            if len(right) >= 2:
+                py.draw.lines(world.win, BLACK, False, right, 4)
 
-                p = self.pointsLeft[i]
-                f = self.pointsLeft[next_index]
-                if p.y >= f.y:
-                    py.draw.line(world.win, BLACK, world.getScreenCoords(p.x, p.y), world.getScreenCoords(f.x, f.y), 4)
+            # optional dashed center line, one dash every other point
+            if DRAW_CENTER_LINE:
+                (lo, hi) = self.centerIndex.query(self.bottomPointIndex, y_min, y_max)
+                start = self.bottomPointIndex + lo
+                start += (start % self.num_points) % 2
+                dashes = self._dashes[start:self.bottomPointIndex + hi + 1:2]
+                a = world.getScreenCoordsArray(dashes[:, :2]).tolist()
+                b = world.getScreenCoordsArray(dashes[:, 2:]).tolist()
+                for i in range(len(a)):
+                    py.draw.line(world.win, (180, 180, 180), a[i], b[i], 2)
 
-                p = self.pointsRight[i]
-                f = self.pointsRight[next_index]
-                if p.y >= f.y:
-                    py.draw.line(world.win, BLACK, world.getScreenCoords(p.x, p.y),world.getScreenCoords(f.x, f.y), 4)
+#Geometry of the road built from a seed, segment by segment, shared read-only by all the
+#roads made from it (Road(world, track)): a generation's tracks are generated once and every
+#evaluation on them just copies the points. Segments are computed on first use and kept.
+class Track:
+    def __init__(self, seed, segments=0):
+        if isinstance(seed, Random):
+            self.rng = seed
+            self.seed = None
+        else:
+            self.seed = newSeed() if seed is None else seed
+            self.rng = Random(self.seed)
+        self.segments = []
+        #generation state: last control point (x, y, angle), last center point and border ys
+        #of the straight start every road begins with
+        (x, y) = startPoints()[-1]
+        self._ctrl = (0, 0, 0.0)
+        self._last = ([x, y], y, y)
+        self.extend(segments)
 
-            # optional dashed center line
-            if DRAW_CENTER_LINE:
-                dash_len = 12
-                gap = 10
-                for i in range(0, len(self.centerPoints), 2):
-                    next_index = getPoint(i+1, NUM_POINTS*self.num_ctrl_points)
-                    p = self.centerPoints[i]
-                    f = self.centerPoints[next_index]
-                    sp = world.getScreenCoords(p.x, p.y)
-                    sf = world.getScreenCoords(f.x, f.y)
-                    # only draw if reasonably on-screen
-                    if -SAFE_SPACE <= sp[1] <= world.win_height + SAFE_SPACE:
-                        # draw short dash segments
-                        dx = sf[0] - sp[0]
-                        dy = sf[1] - sp[1]
-                        dist = (dx*dx + dy*dy) ** 0.5
-                        if dist > 0:
-                            ux = dx / dist
-                            uy = dy / dist
-                            a = (sp[0] + ux * 0, sp[1] + uy * 0)
-                            b = (sp[0] + ux * min(dash_len, dist), sp[1] + uy * min(dash_len, dist))
-                            py.draw.line(world.win, (180, 180, 180), a, b, 2)
+    #computes segments until there are count of them
+    def extend(self, count):
+        while len(self.segments) < count:
+            seg = makeSegment(self.rng, self._ctrl, *self._last)
+            (ctrl, center, left, right) = seg
+            self._ctrl = ctrl
+            self._last = (center[-1].tolist(), left[-1, 1], right[-1, 1])
+            self.segments.append(seg)
+
+    #segment k of the track: (control point, center, left, right) as in makeSegment
+    def segment(self, k):
+        self.extend(k + 1)
+        return self.segments[k]
+
+
+#random seed for the roads built without one, so that they can still be rebuilt later
+def newSeed():
+    return Random().randrange(2**31)
+
+#the straight start of every road, NUM_POINTS center points going up from (0, SPACING)
+def startPoints():
+    return [(0, SPACING - SPACING/NUM_POINTS*i) for i in range(NUM_POINTS)]
+
+#next segment of a road: draws the next control point from rng after the control point
+#ctrl = (x, y, angle) and returns it with the NUM_POINTS (x, y) center, left and right points
+#of the segment, in driving order. prev is the last center point of the road before it,
+#prev_left_y / prev_right_y the y of its borders
+def makeSegment(rng, ctrl, prev, prev_left_y, prev_right_y):
+    (x1, y1, angle1) = ctrl
+
+    # Lateral movement with a soft clamp (prevents huge kinks)
+    dx = (rng.random() - 0.5) * MAX_DEVIATION
+    (x2, y2) = (x1 + dx, y1 - SPACING)
+
+    # Smooth the target tangent angle using previous angle (low-pass filter)
+    target = (rng.random() - 0.5) * MAX_ANGLE
+    smooth = 0.85  # closer to 1.0 = smoother, less variation
+    angle2 = smooth * angle1 + (1.0 - smooth) * target
+
+    #center line of the road, from the bottom of the segment up
+    cx = HERMITE_BASIS @ np.array([x2, SPACING*angle2, x1, SPACING*angle1])
+    cy = y2 + SPACING/NUM_POINTS*SEGMENT_STEPS
+
+    #borders perpendicular to the center line, each point's direction taken from the one before
+    angle = np.arctan2(cx - np.append(prev[0], cx[:-1]), np.append(prev[1], cy[:-1]) - cy)
+    x = ROAD_WIDTH/2 * np.cos(angle)
+    y = ROAD_WIDTH/2 * np.sin(angle)
+    #borders never go back down the screen
+    ly = np.minimum.accumulate(np.append(prev_left_y, cy - y))[1:]
+    ry = np.minimum.accumulate(np.append(prev_right_y, cy + y))[1:]
+
+    center = np.column_stack((cx, cy))
+    left = np.column_stack((cx - x, ly))
+    right = np.column_stack((cx + x, ry))
+    return ((x2, y2, angle2), center, left, right)
+
+
+#y-sorted index of the segments of a border, kept up to date point by point as the road grows.
+#Borders never go back down, so from the bottom point the ring is sorted by decreasing y:
+#-y of every point (mirrored like the points) is a sorted key for binary search.
+class SegmentIndex:
+    def __init__(self, num_points):
+        self.num_points = num_points
+        self.keys = np.full(2*num_points, -1000.0)
+
+    def update(self, i, y):
+        self.keys[i] = self.keys[i+self.num_points] = -y
+
+    #range [lo, hi) of the segments (positions from the bottom point) overlapping [y_min, y_max]
+    def query(self, bottom, y_min, y_max):
+        keys = self.keys[bottom:bottom+self.num_points]
+        #segment k goes from point k down to point k+1: it starts above y_min...
+        hi = min(int(np.searchsorted(keys, -y_min, side="right")), self.num_points-1)
+        #...and ends below y_max
+        lo = max(int(np.searchsorted(keys, -y_max, side="left")) - 1, 0)
+        return (lo, max(lo, hi))
 
 def getPoint(i, cap):
     return (i+cap)%cap
@@ -0,0 +1,88 @@
+from config_variables import *
+import numpy as np
+
+#offsets of the 4 sensor lines, the other 4 sensors look the opposite way
+SENSOR_ANGLES = 45*np.arange(4)
+
+
+#raw sensor distances (0..SENSOR_DISTANCE) for all cars at once, shape (n_cars, 8).
+#xs, ys, rots are per car, borders is a list of (n_points, 2) polylines in ring order.
+#It's the same computation as Car.getInputs/getDistance, done for every car, segment
+#and sensor line in one pass.
+def castSensors(xs, ys, rots, borders):
+    xs = np.asarray(xs, dtype=float)
+    ys = np.asarray(ys, dtype=float)
+    rots = np.asarray(rots, dtype=float)
+    n = len(xs)
+    sensors = np.full((n, 8), float(SENSOR_DISTANCE))
+    if n == 0:
+        return sensors
+
+    #sensor line equations, shape (n_cars, 1, 4)
+    omega = rots[:, None] + SENSOR_ANGLES
+    qx = xs[:, None] + SENSOR_DISTANCE*np.sin(np.radians(omega))
+    qy = ys[:, None] - SENSOR_DISTANCE*np.cos(np.radians(omega))
+    x = xs[:, None, None]
+    y = ys[:, None, None]
+    a1 = (ys[:, None] - qy)[:, None, :]
+    b1 = (qx - xs[:, None])[:, None, :]
+    c1 = (xs[:, None]*qy - qx*ys[:, None])[:, None, :]
+    omega = omega[:, None, :]
+
+    for v in borders:
+        if len(v) < 2:
+            continue
+        #segment equations, shape (1, n_segments, 1)
+        px = v[:-1, 0][None, :, None]
+        py = v[:-1, 1][None, :, None]
+        fx = v[1:, 0][None, :, None]
+        fy = v[1:, 1][None, :, None]
+        a2 = py - fy
+        b2 = fx - px
+        c2 = px*fy - fx*py
+
+        #getInputs walks from the bottom while the segment start is above the sensor range
+        walked = np.logical_and.accumulate(v[:-1, 1][None, :] > (ys - SENSOR_DISTANCE)[:, None], axis=1)
+
+        with np.errstate(divide="ignore", invalid="ignore"):
+            d = b1*a2 - a1*b2
+            iy = (a1*c2 - c1*a2)/d
+            ix = (c1*b2 - b1*c2)/d
+        hit = (d != 0) & ~(((iy - py)*(iy - fy) > 0) | ((ix - px)*(ix - fx) > 0))
+
+        #same coefficients: getDistance falls back to the segment extent
+        same = (a1 == a2) & (b1 == b2)
+        ix = np.where(same, np.abs(px - fx), ix)
+        iy = np.where(same, np.abs(py - fy), iy)
+        hit = (hit | same) & walked[:, :, None]
+
+        dist = ((x - ix)**2 + (y - iy)**2)**0.5
+
+        #same front/back test as getDistance (angles in degrees fed to cos/sin as is)
+        alpha = 90 - np.degrees(np.arctan2(y - iy, ix - x))
+        front = np.cos(alpha)*np.cos(omega)*100 + np.sin(alpha)*np.sin(omega)*100 > 0
+
+        sensors[:, :4] = np.minimum(sensors[:, :4], np.where(hit & front, dist, np.inf).min(axis=1))
+        sensors[:, 4:] = np.minimum(sensors[:, 4:], np.where(hit & ~front, dist, np.inf).min(axis=1))
+
+    return sensors
+
+#border segments a sensor of these cars can reach: a hit further than SENSOR_DISTANCE
+#never counts, so the rest of the road can't change the result
+def getSensorBorders(road, ys):
+    if len(ys) == 0:
+        return []
+    return road.borderSegments(min(ys) - SENSOR_DISTANCE, max(ys) + SENSOR_DISTANCE)
+
+#normalized sensor inputs for a list of cars, same values as Car.getInputs for each of them
+def getSensorInputs(cars, road):
+    xs = [car.x for car in cars]
+    ys = [car.y for car in cars]
+    rots = [car.rot for car in cars]
+    #convert to value between 0 (distance = max) and 1 (distance = 0)
+    return 1 - castSensors(xs, ys, rots, getSensorBorders(road, ys))/SENSOR_DISTANCE
+
+#the same for the rows of a CarBatch, read straight from its arrays
+def getBatchSensorInputs(batch, rows, road):
+    ys = batch.y[rows]
+    return 1 - castSensors(batch.x[rows], ys, batch.rot[rows], getSensorBorders(road, ys))/SENSOR_DISTANCE
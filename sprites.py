@@ -0,0 +1,48 @@
+import os
+import pygame as py
+from config_variables import SPRITE_ROTATION_STEP
+
+CAR_IMGS = ["yellow_car.png", "red_car.png", "blu_car.png", "green_car.png"]
+BRAKE_IMG = "brakes.png"
+
+# size for car png(can be tuned for better quality/performance)
+SPRITE_SIZE = (160, 92)
+
+
+class Sprite:
+    #an image of imgs/ shared by all cars, loaded and scaled only once on first use
+    def __init__(self, name):
+        self.name = name
+        self._img = None
+        #pre-rotated copies keyed by quantized angle, at most 360/SPRITE_ROTATION_STEP entries
+        self._rotated = {}
+
+    @property
+    def img(self):
+        if self._img is None:
+            # Load at native resolution
+            img = py.image.load(os.path.join("imgs", self.name)).convert_alpha()
+            # High quality downscale/upscale
+            img = py.transform.smoothscale(img, SPRITE_SIZE)
+            #rotation because of stupid png orientation
+            self._img = py.transform.rotate(img, -90)
+        return self._img
+
+    #image rotated by rot degrees (clockwise) and the offset of its center
+    def rotated(self, rot):
+        key = int(round(rot / SPRITE_ROTATION_STEP)) % int(round(360 / SPRITE_ROTATION_STEP))
+        entry = self._rotated.get(key)
+        if entry is None:
+            img = py.transform.rotate(self.img, -key * SPRITE_ROTATION_STEP)
+            entry = self._rotated[key] = (img, (img.get_width() // 2, img.get_height() // 2))
+        return entry
+
+
+#process-wide atlas, one Sprite per image name
+_atlas = {}
+
+def getSprite(name):
+    sprite = _atlas.get(name)
+    if sprite is None:
+        sprite = _atlas[name] = Sprite(name)
+    return sprite
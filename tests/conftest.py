@@ -0,0 +1,5 @@
+import os
+
+#nothing is shown, and the sprites are loaded relative to the repository root
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.chdir(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,63 @@
+import random
+
+import numpy as np
+import neat
+import pytest
+
+from batchnet import PopulationNet
+
+
+@pytest.fixture(scope="module")
+def config():
+    return neat.config.Config(neat.DefaultGenome, neat.DefaultReproduction, neat.DefaultSpeciesSet,
+                              neat.DefaultStagnation, "config_file.txt")
+
+
+#genomes of 30 generations evolved on random fitness, so that they have hidden nodes
+@pytest.fixture(scope="module")
+def generations(config):
+    random.seed(0)
+    p = neat.Population(config)
+
+    def fitness(genomes, config):
+        for _, g in genomes:
+            g.fitness = random.random()
+
+    generations = []
+    for _ in range(30):
+        generations.append(list(p.population.values()))
+        p.run(fitness, 1)
+    return generations
+
+
+def reference(genomes, config, inputs):
+    nets = [neat.nn.FeedForwardNetwork.create(g, config) for g in genomes]
+    return np.array([net.activate(tuple(inp)) for net, inp in zip(nets, inputs.tolist())])
+
+
+#all the rows and random subsets of them against neat's FeedForwardNetwork
+def test_activate_matches_feed_forward(config, generations):
+    rng = np.random.default_rng(0)
+    for genomes in generations:
+        net = PopulationNet(genomes, config)
+        for _ in range(5):
+            inputs = rng.random((len(genomes), net.num_inputs))
+            ref = reference(genomes, config, inputs)
+            np.testing.assert_allclose(net.activate(inputs), ref, rtol=0, atol=1e-9)
+            rows = np.flatnonzero(rng.random(len(genomes)) < 0.3)
+            np.testing.assert_allclose(net.activate(inputs[rows], rows), ref[rows], rtol=0, atol=1e-9)
+
+
+#rows leaving one by one like dying cars, then all of them again
+def test_activate_shrinking_rows(config, generations):
+    rng = np.random.default_rng(1)
+    genomes = generations[-1]
+    net = PopulationNet(genomes, config)
+    rows = np.arange(len(genomes))
+    while len(rows):
+        inputs = rng.random((len(genomes), net.num_inputs))
+        ref = reference(genomes, config, inputs)
+        np.testing.assert_allclose(net.activate(inputs[rows], rows), ref[rows], rtol=0, atol=1e-9)
+        rows = rows[rng.random(len(rows)) < 0.8]
+    inputs = rng.random((len(genomes), net.num_inputs))
+    np.testing.assert_allclose(net.activate(inputs), reference(genomes, config, inputs), rtol=0, atol=1e-9)
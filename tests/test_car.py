@@ -0,0 +1,50 @@
+from random import Random
+
+import numpy as np
+import pygame as py
+import pytest
+
+from car import Car, CarBatch
+
+
+#the car sprites need a display mode
+@pytest.fixture(scope="module", autouse=True)
+def display():
+    py.display.set_mode((1, 1))
+
+
+def states(cars):
+    return np.array([[car.x, car.y, car.rot, car.vel, car.acc] for car in cars])
+
+
+#CarBatch.move against Car.move on random commands, bit for bit
+def test_batch_move_matches_car():
+    rng = Random(0)
+    n = 200
+    batch = CarBatch(n)
+    single = [Car(0, 0, 0) for _ in range(n)]
+    for t in range(1, 501):
+        commands = [[rng.random() for _ in range(4)] for _ in range(n)]
+        for car, c in zip(single, commands):
+            car.commands = c
+            car.move(None, t)
+        batch.move(t, commands=commands)
+    np.testing.assert_array_equal(states(single), batch.state)
+
+
+#only the given rows move, the other ones keep their state
+def test_batch_move_rows():
+    rng = Random(1)
+    n = 50
+    batch = CarBatch(n)
+    single = [Car(0, 0, 0) for _ in range(n)]
+    rows = np.arange(n)
+    for t in range(1, 301):
+        commands = [[rng.random() for _ in range(4)] for _ in rows]
+        for r, c in zip(rows.tolist(), commands):
+            single[r].commands = c
+            single[r].move(None, t)
+        batch.move(t, rows, np.array(commands))
+        if t % 20 == 0:
+            rows = rows[1::2] if len(rows) > 1 else rows
+    np.testing.assert_array_equal(states(single), batch.state)
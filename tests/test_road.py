@@ -0,0 +1,44 @@
+from math import atan2, cos, sin
+from random import Random
+
+import numpy as np
+import pytest
+
+from config_variables import *
+from road import makeSegment, startPoints
+
+interpolate = pytest.importorskip("scipy.interpolate")
+
+
+#makeSegment as it was: a CubicSpline for the center line and a loop over the points for the borders
+def referenceSegment(rng, ctrl, prev, prev_left_y, prev_right_y):
+    (x1, y1, angle1) = ctrl
+    (x2, y2) = (x1 + (rng.random() - 0.5) * MAX_DEVIATION, y1 - SPACING)
+    angle2 = 0.85 * angle1 + (1.0 - 0.85) * ((rng.random() - 0.5) * MAX_ANGLE)
+    y_tmp = [y2+SPACING/NUM_POINTS*i for i in range(NUM_POINTS)]
+    res = interpolate.CubicSpline([y2, y1], [x2, x1], bc_type=((1,angle2),(1,angle1)))(y_tmp)
+    (center, left, right) = (np.empty((NUM_POINTS, 2)), np.empty((NUM_POINTS, 2)), np.empty((NUM_POINTS, 2)))
+    ((px, py), ly, ry) = (prev, prev_left_y, prev_right_y)
+    for i in range(NUM_POINTS):
+        (cx, cy) = (float(res[NUM_POINTS-i-1]), y_tmp[NUM_POINTS-i-1])
+        angle = atan2(cx-px, py-cy)
+        (x, y) = (ROAD_WIDTH/2 * cos(angle), ROAD_WIDTH/2 * sin(angle))
+        (ly, ry) = (min(cy - y, ly), min(cy + y, ry))
+        (center[i], left[i], right[i]) = ((cx, cy), (cx - x, ly), (cx + x, ry))
+        (px, py) = (cx, cy)
+    return ((x2, y2, angle2), center, left, right)
+
+
+#the closed-form segments against the CubicSpline ones, over 10 roads of 200 segments
+def test_segments_match_cubic_spline():
+    for seed in range(10):
+        (a, b) = (Random(seed), Random(seed))
+        (x, y) = startPoints()[-1]
+        (ctrl, last) = ((0.0, 0.0, 0.0), ([x, y], y, y))
+        for _ in range(200):
+            seg = makeSegment(a, ctrl, *last)
+            ref = referenceSegment(b, ctrl, *last)
+            assert seg[0] == ref[0]
+            for (s, r) in zip(seg[1:], ref[1:]):
+                np.testing.assert_allclose(s, r, rtol=0, atol=1e-9)
+            (ctrl, last) = (seg[0], (seg[1][-1].tolist(), seg[2][-1, 1], seg[3][-1, 1]))
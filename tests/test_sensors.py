@@ -0,0 +1,26 @@
+from random import Random
+
+import numpy as np
+
+from config_variables import *
+from world import World
+from road import Road
+from car import Car
+from sensors import getSensorInputs
+
+
+#the vectorized sensors against Car.getInputs on a random road
+def test_sensor_inputs_match_car():
+    rng = Random(0)
+    world = World(STARTING_POS, WIN_WIDTH, WIN_HEIGHT)
+    road = Road(world, 0)
+    cars = []
+    for _ in range(200):
+        car = Car((rng.random() - 0.5)*300, SPACING - rng.random()*SPACING*4, 0)
+        car.rot = (rng.random() - 0.5)*120
+        cars.append(car)
+
+    batch = getSensorInputs(cars, road)
+    single = np.array([car.getInputs(world, road) for car in cars])
+    assert batch.shape == single.shape
+    np.testing.assert_allclose(batch, single, rtol=0, atol=1e-9)
@@ -0,0 +1,44 @@
+from collections import OrderedDict
+import pygame as py
+from config_variables import TEXT_CACHE_SIZE
+
+#Fonts, rendered strings and translucent panels used by the overlays (HUD, badges,
+#model outputs). SysFont does a system font lookup every call and most overlay text
+#never changes, so everything is created once and reused.
+
+_fonts = {}
+_texts = OrderedDict()
+_panels = {}
+
+
+def get_font(name, size, bold=False):
+    key = (name, size, bold)
+    font = _fonts.get(key)
+    if font is None:
+        if not py.font.get_init():
+            py.font.init()
+        font = _fonts[key] = py.font.SysFont(name, size, bold=bold)
+    return font
+
+#rendered (antialiased) text, the least recently used strings are dropped first so
+#changing values (fitness, outputs...) don't grow the cache
+def render_text(text, name, size, color, bold=False):
+    key = (text, name, size, color, bold)
+    surf = _texts.get(key)
+    if surf is None:
+        surf = _texts[key] = get_font(name, size, bold).render(text, True, color)
+        if len(_texts) > TEXT_CACHE_SIZE:
+            _texts.popitem(last=False)
+    else:
+        _texts.move_to_end(key)
+    return surf
+
+#translucent rounded panel with a 1px border, one surface per size/style
+def get_panel(size, fill, border, radius):
+    key = (size, fill, border, radius)
+    panel = _panels.get(key)
+    if panel is None:
+        panel = _panels[key] = py.Surface(size, py.SRCALPHA)
+        panel.fill(fill)
+        py.draw.rect(panel, border, panel.get_rect(), 1, border_radius=radius)
+    return panel
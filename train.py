@@ -1,19 +1,223 @@
 import os
 import pickle
+import time
+import atexit
+import random
+import numpy as np
 import pygame as py
 import neat
 
-from car import Car
-from road import Road
+from car import Car, CarBatch
+from road import Road, Track
 from world import World
 from NNdraw import NN
+from sensors import getBatchSensorInputs
+from collision import getBatchCollisions
+from batchnet import PopulationNet
+from textcache import render_text, get_panel
+from pacing import FramePacer
+from profiler import PhaseProfiler, NULL_PROFILER, PHASES, phase_shares
+from checkpoint import AsyncCheckpointer, BackgroundFileWriter, restore_checkpoint
+from metrics import LogFile, MetricsReporter
+from recording import COLUMNS, RunRecorder, save_run, run_path
+from capture import FrameCapture, use_offscreen_display
 from config_variables import *
 
 
 _bg_cache = None
 _fonts_ready = False
+_headless = HEADLESS
+_road_seed = ROAD_SEED
+_nn_cache = {}
+_pacer = None
+_profiler = PhaseProfiler() if PROFILE else NULL_PROFILER
+_last_episode = None
+_record_writer = None
+_capture = None
 GEN = 0
 
+#why a car's episode ended: how it died, or what ended the generation while it was alive
+END_REASONS = ("crash", "behind", "backward", "stalled", "no_progress",
+               "max_steps", "time_budget", "fitness_threshold", "window_closed")
+
+#run the simulation without a visible window, frame cap or drawing
+def enable_headless(enabled=True):
+    global _headless
+    _headless = enabled
+    if enabled:
+        # must be set before the display is initialised by World
+        os.environ["SDL_VIDEODRIVER"] = "dummy"
+
+#draw offscreen and save the frames to path (.y4m video or PNG directory), see capture.py.
+#The frames keep the frame cap, so the video plays at the speed they were drawn. With drop
+#(training) the simulation never waits for the writer, the frames it can't keep up with are
+#dropped with a warning; without, every frame is written however long it takes
+def enable_capture(path, drop=True):
+    global _capture
+    close_capture()
+    use_offscreen_display()
+    _capture = FrameCapture(path, drop=drop)
+    atexit.register(close_capture)
+    return _capture
+
+#writes the frames still queued and stops capturing
+def close_capture():
+    global _capture
+    if _capture is not None:
+        _capture.close()
+        print(_capture.summary())
+        _capture = None
+
+#puts a finished frame on the window, or hands it to the capture when drawing offscreen
+def show_frame(world):
+    if _capture is not None:
+        _capture.capture(world.win)
+    if not world.offscreen:
+        py.display.update()
+
+#new World, offscreen while capturing
+def make_world():
+    return World(STARTING_POS, WIN_WIDTH, WIN_HEIGHT, offscreen=_capture is not None)
+
+#per-phase timing of the training loop, see profiler.py
+def enable_profiling(enabled=True):
+    global _profiler
+    if not enabled:
+        _profiler = NULL_PROFILER
+    elif not _profiler.enabled:
+        _profiler = PhaseProfiler()
+
+#the profiler of this process (NULL_PROFILER when profiling is off)
+def get_profiler():
+    return _profiler
+
+#profile of the last finished generation, None if profiling is off or nothing ran yet
+def get_profile():
+    return _profiler.last() if _profiler.enabled else None
+
+#summary of the last simulated generation, see merge_episodes
+def get_episode():
+    return _last_episode
+
+#the episodes of one generation as one summary, episodes[k] lists those of its track k
+#(one per chunk of genomes with parallel workers, see simulate).
+#A track's steps and ended_by are the ones of its longest chunk, "tracks" has them for
+#every track; over the generation steps add up and ended_by lists the tracks' ones, comma
+#separated. reasons maps every genome key to its reason on each track, counts tallies them all
+def merge_episodes(episodes):
+    merged = {"steps": 0, "counts": dict.fromkeys(END_REASONS, 0), "reasons": {}, "tracks": []}
+    for chunks in episodes:
+        longest = max(chunks, key=lambda e: e["steps"])
+        merged["tracks"].append({"steps": longest["steps"], "ended_by": longest["ended_by"]})
+        merged["steps"] += longest["steps"]
+        for e in chunks:
+            for r, n in e["counts"].items():
+                merged["counts"][r] += n
+            for key, r in e["reasons"].items():
+                merged["reasons"].setdefault(key, []).append(r)
+    merged["ended_by"] = ",".join(t["ended_by"] for t in merged["tracks"])
+    return merged
+
+#the run of the generation's best genome (by its fitness over all the tracks) from the
+#recordings of simulate, None if it wasn't recorded: {"genome", "fitness", "seed", "trajectory"}
+def best_run(genomes, recordings):
+    if not genomes:
+        return None
+    (key, g) = max(genomes, key=lambda kg: kg[1].fitness)
+    for rec in recordings:
+        if key in rec["rows"]:
+            return {"genome": key, "fitness": g.fitness, "seed": rec["seed"],
+                    "trajectory": rec["recorder"].trajectory(rec["rows"][key])}
+    return None
+
+#saves the best run of generation gen (see best_run) to RECORD_DIR, written in the background
+def save_best_run(gen, run):
+    global _record_writer
+    if _record_writer is None:
+        os.makedirs(RECORD_DIR, exist_ok=True)
+        _record_writer = BackgroundFileWriter()
+        atexit.register(close_recordings)
+    meta = {"generation": gen, "seed": run["seed"], "genome": run["genome"], "fitness": run["fitness"],
+            "steps": len(run["trajectory"]), "columns": list(COLUMNS)}
+    save_run(run_path(RECORD_DIR, gen), run["trajectory"], meta, _record_writer)
+
+#waits for the recordings still being written
+def close_recordings():
+    global _record_writer
+    if _record_writer is not None:
+        _record_writer.close()
+        _record_writer = None
+
+#last generation's profile and episode summary as flat metrics fields
+def generation_metrics():
+    fields = {}
+    profile = get_profile()
+    if profile is not None:
+        fields["steps_per_sec"] = profile["steps_per_sec"]
+        fields["car_steps_per_sec"] = profile["car_steps_per_sec"]
+        for phase, seconds in profile["phases"].items():
+            fields[f"time_{phase}"] = seconds
+    if _last_episode is not None:
+        fields["steps"] = _last_episode["steps"]
+        fields["ended_by"] = _last_episode["ended_by"]
+        for r, n in _last_episode["counts"].items():
+            fields[f"end_{r}"] = n
+    return fields
+
+#fitness at which the generation can stop early, None when the rule doesn't apply.
+#A track's score is the genome's fitness only with one track per genome: with several,
+#one good track says nothing about the reduced fitness, so no track is cut short
+def stop_fitness(config):
+    if not STOP_AT_FITNESS_THRESHOLD or config.no_fitness_termination or config.fitness_criterion != "max":
+        return None
+    if TRACKS_PER_GENOME > 1:
+        return None
+    return config.fitness_threshold
+
+#base seed of the road schedule, None gives a random road every generation
+def set_road_seed(seed):
+    global _road_seed
+    _road_seed = seed
+
+#seeds of the TRACKS_PER_GENOME tracks of generation gen: base seed + generation with one
+#track, the same road every generation without ROAD_SEED_PER_GENERATION.
+#None (no base seed) gives random tracks
+def track_seeds(gen):
+    k = TRACKS_PER_GENOME
+    if _road_seed is None:
+        return [None] * k
+    first = _road_seed + (gen - 1) * k + 1 if ROAD_SEED_PER_GENERATION else _road_seed
+    return [first + i for i in range(k)]
+
+#the tracks of generation gen, generated once and shared by all the evaluations
+def make_tracks(gen):
+    return [Track(seed, TRACK_PRECOMPUTE_SEGMENTS) for seed in track_seeds(gen)]
+
+#(deadline, max_steps) of each of the n tracks of a generation that starts now, from the
+#generation's budget (MAX_SECONDS, MAX_STEPS): track k must end by the (k+1)-th n-th of
+#the wall-clock budget (time a track leaves goes to the next ones) and gets MAX_STEPS / n
+#steps. Deadlines are time.monotonic() times, which worker processes share.
+#None = no limit
+def track_budgets(n):
+    start = time.monotonic()
+    return [(start + MAX_SECONDS * (k + 1) / n if MAX_SECONDS else None,
+             max(1, MAX_STEPS // n) if MAX_STEPS else None) for k in range(n)]
+
+#combines the fitness of one genome on every track (TRACK_REDUCER)
+def reduce_fitness(values, reducer=None):
+    reducer = reducer or TRACK_REDUCER
+    if reducer.startswith("p"):
+        return float(np.percentile(values, float(reducer[1:])))
+    return float({"mean": np.mean, "min": np.min, "max": np.max, "median": np.median}[reducer](values))
+
+#network visualization of a genome, built the first time it becomes the best of the
+#generation and reused afterwards (cleared at the end of each generation)
+def get_nn(config, genome):
+    nn = _nn_cache.get(genome.key)
+    if nn is None:
+        nn = _nn_cache[genome.key] = NN(config, genome, (90, 210))
+    return nn
+
 #check pygame health
 def ensure_pygame_ready():
     global _fonts_ready
@@ -43,18 +247,16 @@ def get_bg():
         _bg_cache = make_bg(WIN_WIDTH, WIN_HEIGHT)
     return _bg_cache
 
-#draw heads-up UI elements
-def draw_hud(world, gen, alive):
+#draw heads-up UI elements, returns the y just below the panel
+def draw_hud(world, gen, alive, speed=None):
     ensure_pygame_ready()
 
     margin = 12
-    panel_w, panel_h = 240, 86
+    panel_w, panel_h = 240, 86 if speed is None else 110
     x = world.win_width - panel_w - margin
     y = margin
 
-    panel = py.Surface((panel_w, panel_h), py.SRCALPHA)
-    panel.fill((255, 255, 255, 170))
-    py.draw.rect(panel, (40, 40, 40, 60), panel.get_rect(), 1, border_radius=10)
+    panel = get_panel((panel_w, panel_h), (255, 255, 255, 170), (40, 40, 40, 60), 10)
     world.win.blit(panel, (x, y))
 
     lines = [
@@ -62,20 +264,46 @@ def draw_hud(world, gen, alive):
         ("Alive", str(alive)),
         ("Best fitness", f"{world.getScore():.2f}"),
     ]
-
-    font_label = py.font.SysFont("consolas", 18)
-    font_val = py.font.SysFont("consolas", 18, bold=True)
+    if speed is not None:
+        lines.append(("Speed", speed))
 
     yy = y + 8
     for k, v in lines:
-        label = font_label.render(f"{k}:", True, (25, 25, 25))
-        val = font_val.render(v, True, (25, 25, 25))
+        label = render_text(f"{k}:", "consolas", 18, (25, 25, 25))
+        val = render_text(v, "consolas", 18, (25, 25, 25), bold=True)
         world.win.blit(label, (x + 12, yy))
         world.win.blit(val, (x + 140, yy))
         yy += 24
+    return y + panel_h
+
 
+#timing overlay: live steps/sec and where the time of the current generation goes,
+#drawn from top (the bottom of the panel above it) down
+def draw_profile_hud(world, profile, top):
+    margin = 12
+    panel_w = 240
+    line_h = 20
+    panel_h = 16 + line_h * (2 + len(PHASES))
+    x = world.win_width - panel_w - margin
+    y = top + 8
 
-def draw_win(cars, road, world, gen):
+    panel = get_panel((panel_w, panel_h), (255, 255, 255, 170), (40, 40, 40, 60), 10)
+    world.win.blit(panel, (x, y))
+
+    lines = [
+        ("Steps/s", f"{profile['steps_per_sec']:.0f}"),
+        ("Car steps/s", f"{profile['car_steps_per_sec']:.0f}"),
+    ]
+    lines += [(phase, f"{share:.1f}%") for phase, share in phase_shares(profile).items()]
+
+    yy = y + 8
+    for k, v in lines:
+        world.win.blit(render_text(k, "consolas", 16, (25, 25, 25)), (x + 12, yy))
+        world.win.blit(render_text(v, "consolas", 16, (25, 25, 25), bold=True), (x + 140, yy))
+        yy += line_h
+
+
+def draw_win(cars, road, world, gen, speed=None, update=True, profile=None):
     world.win.blit(get_bg(), (0, 0))
     road.draw(world)
 
@@ -91,33 +319,49 @@ def draw_win(cars, road, world, gen):
     if world.bestNN is not None:
         world.bestNN.draw(world)
 
-    draw_hud(world, gen, len(cars))
-    py.display.update()
+    bottom = draw_hud(world, gen, len(cars), speed)
+    if profile is not None:
+        draw_profile_hud(world, profile, bottom)
+    if update:
+        show_frame(world)
 
 
 #save best genome continuously during training even on abrupt exit
+#(the genome is pickled right away, the file is written on a background thread)
 class BestGenomeSaver(neat.reporting.BaseReporter):
-    def __init__(self, path):
+    def __init__(self, path, best_fitness=float("-inf")):
         self.path = path
-        self.best_fitness = float("-inf")
+        self.best_fitness = best_fitness
+        self.writer = BackgroundFileWriter()
 
     def post_evaluate(self, config, population, species_set, best_genome):
         if best_genome is None or best_genome.fitness is None:
             return
         if best_genome.fitness > self.best_fitness:
             self.best_fitness = best_genome.fitness
-            with open(self.path, "wb") as f:
-                pickle.dump(best_genome, f)
+            self.writer.write(self.path, pickle.dumps(best_genome))
+
+    def close(self):
+        self.writer.close()
 
 #generating report for each generation during training(saves as report.txt)
+#with profile=True every line also has the loop speed and the share of time per phase,
+#append=True continues an existing report (resumed runs). The file stays open, lines
+#are written out by LogFile's flush policy and when the reporter is closed
 class FileGenerationReporter(neat.reporting.BaseReporter):
-    def __init__(self, filename):
+    def __init__(self, filename, profile=False, append=False):
         self.filename = filename
         self.generation = 0
-        with open(self.filename, "w", encoding="utf-8") as f:
-            f.write("NEAT Training Report\n")
-            f.write("====================\n\n")
-            f.write("Gen | BestFitness | MeanFitness | StdFitness | Species\n")
+        self.profile = profile
+        continued = append and os.path.exists(filename)
+        self.log = LogFile(filename, "a" if continued else "w", METRICS_FLUSH_RECORDS, METRICS_FLUSH_SECONDS)
+        if continued:
+            return
+        header = "Gen | BestFitness | MeanFitness | StdFitness | Species"
+        if profile:
+            header += " | Steps/s | CarSteps/s | " + " | ".join(f"{p}%" for p in PHASES)
+        self.log.write("NEAT Training Report\n====================\n\n" + header + "\n")
+        self.log.flush()
 
     def start_generation(self, generation):
         self.generation = generation
@@ -143,94 +387,243 @@ class FileGenerationReporter(neat.reporting.BaseReporter):
             f"{best:10.4f} | "
             f"{mean:10.4f} | "
             f"{std:10.4f} | "
-            f"{species_count}\n"
+            f"{species_count}"
         )
-        with open(self.filename, "a", encoding="utf-8") as f:
-            f.write(line)
+        if self.profile:
+            profile = get_profile()
+            if profile is not None:
+                line += (
+                    f" | {profile['steps_per_sec']:7.0f} | {profile['car_steps_per_sec']:10.0f} | "
+                    + " | ".join(f"{share:5.1f}" for share in phase_shares(profile).values())
+                )
+        self.log.write(line + "\n")
+
+    def close(self):
+        self.log.close()
 
 
-#NEAT training and evaluation loop
+#the training window's pacer, kept across generations so the chosen speed sticks
+def get_pacer():
+    global _pacer
+    if _pacer is None:
+        _pacer = FramePacer()
+    return _pacer
+
+#generations that are drawn, the first one is always shown
+def render_generation(gen):
+    return not _headless and (gen - 1) % max(1, RENDER_EVERY_N_GENERATIONS) == 0
+
+
+#NEAT training and evaluation loop: all the genomes drive every track of the generation
+#together, their fitness is reduced over the tracks. Only the first track can be drawn
 def eval_genomes(genomes, config):
-    global GEN
+    global GEN, _last_episode
     GEN += 1
+    _profiler.begin(GEN)
+
+    scores = [[] for _ in genomes]
+    episodes = []
+    tracks = make_tracks(GEN)
+    for k, (track, (deadline, max_steps)) in enumerate(zip(tracks, track_budgets(len(tracks)))):
+        episodes.append(simulate(genomes, config, track, render_generation(GEN) and k == 0,
+                                 record=RECORD_BEST_RUN and k == 0, deadline=deadline, max_steps=max_steps))
+        for s, (_, g) in zip(scores, genomes):
+            s.append(g.fitness)
+    for s, (_, g) in zip(scores, genomes):
+        g.fitness = reduce_fitness(s)
+
+    _profiler.end()
+    _last_episode = merge_episodes([[e] for e in episodes])
+    run = best_run(genomes, [e["recording"] for e in episodes if "recording" in e])
+    if run is not None:
+        save_best_run(GEN, run)
+
+
+#run all genomes together on one road until every car is dead, sets their fitness.
+#track is anything Road accepts: a seed or a Track.
+#Also used by the parallel workers, which pass the same track for every chunk.
+#The simulation always advances one fixed step at a time, render only decides
+#whether (and how often, see FramePacer) the steps are shown.
+#Returns the episode summary {"steps", "ended_by", "counts", "reasons"}: reasons maps
+#every genome key to the END_REASONS entry that ended its episode, counts tallies
+#them and ended_by is what ended the episode ("all_dead" or a generation rule).
+#With record, "recording" also holds the runs of all the genomes on this road:
+#{"seed", "recorder": recording.RunRecorder, "rows": {genome key: row}} (see best_run)
+#deadline (a time.monotonic() time) and max_steps end the episode early, they are the
+#share of the generation's budget given to this call (see track_budgets), None = no limit
+def simulate(genomes, config, track=None, render=None, record=False, deadline=None, max_steps=None):
+    global _last_episode
     ensure_pygame_ready()
-
-    nets, ge, cars, nns = [], [], [], []
+    if render is None:
+        render = not _headless
+    pacer = None if _headless else get_pacer()
+    #timed by eval_genomes, which starts and ends the generation's profile
+    prof = _profiler
+
+    reasons = {}
+    ended_by = "all_dead"
+    threshold = stop_fitness(config)
     t = 0
 
-    world = World(STARTING_POS, WIN_WIDTH, WIN_HEIGHT)
-    road = Road(world)
-    clock = py.time.Clock()
-
-    for _, g in genomes:
-        nets.append(neat.nn.FeedForwardNetwork.create(g, config))
-        cars.append(Car(0, 0, 0))
-        g.fitness = 0.0
-        ge.append(g)
-        nns.append(NN(config, g, (90, 210)))
+    world = make_world()
+    road = Road(world, track)
+
+    #every car's state in one CarBatch, row r is driven by the network of genomes[r];
+    #cars[r] is a view of that row for drawing
+    ge = [g for _, g in genomes]
+    net = PopulationNet(ge, config)
+    batch = CarBatch(len(ge))
+    cars = [Car(0, 0, 0, batch, r) for r in range(len(ge))]
+    recorder = RunRecorder(len(ge)) if record else None
+    #accumulated in arrays, given to the genomes when the simulation ends
+    fitness = np.zeros(len(ge))
+    #per car: y it has to get ahead of and the step it last did, for NO_PROGRESS_STEPS
+    progress_y = np.zeros(len(ge))
+    progress_t = np.zeros(len(ge), dtype=int)
+    rows = batch.living()
+    #building the world, road, networks and cars
+    prof.lap("setup")
 
     run_loop = True
     while run_loop:
         t += 1
-        clock.tick(FPS)
+        prof.count(len(rows))
+        #sensors of every car in one vectorized pass, one row per car
+        sensors = getBatchSensorInputs(batch, rows, road)
+        inputs = np.concatenate((sensors, (batch.vel.take(rows) / MAX_VEL)[:, None]), axis=1)
+        prof.lap("sensing")
+        outputs = net.activate(inputs, rows)
+        prof.lap("activation")
+
+        y_old = batch.y.take(rows)
+        batch.move(t, rows, outputs)
+        if recorder is not None:
+            recorder.record(rows, batch)
+        prof.lap("physics")
+
+        #collisions of every car at once, only checked after the start
+        crashed = getBatchCollisions(batch, rows, road) if t > 10 else np.zeros(len(rows), dtype=bool)
+        prof.lap("collision")
+
+        (x, y, vel) = (batch.x.take(rows), batch.y.take(rows), batch.vel.take(rows))
+        forward_progress = -(y - y_old)
+        f = fitness.take(rows)
+        f += forward_progress / 100.0
+        f += vel * SCORE_VEL_MULTIPLIER
+
+        #what ends a car's episode this step, checked in this order
+        ends = []
+        if t > 10:
+            ends += [("crash", crashed),
+                     ("behind", y > world.getBestCarPos()[1] + BAD_GENOME_TRESHOLD),
+                     ("backward", y > y_old),
+                     ("stalled", vel < 0.1)]
+        dead = np.zeros(len(rows), dtype=bool)
+        for (_, e) in ends:
+            dead = dead | e
+        if NO_PROGRESS_STEPS:
+            ahead = ~dead & (y < progress_y[rows] - NO_PROGRESS_DISTANCE)
+            progress_y[rows[ahead]] = y[ahead]
+            progress_t[rows[ahead]] = t
+            ends.append(("no_progress", ~dead & ~ahead & (t - progress_t[rows] > NO_PROGRESS_STEPS)))
+            dead |= ends[-1][1]
+
+        if dead.any():
+            for i in dead.nonzero()[0].tolist():
+                reasons[ge[rows[i]].key] = next(r for (r, e) in ends if e[i])
+            f[dead] -= 1
+            fitness[rows] = f
+            batch.kill(rows[dead])
+            (rows, x, y, f, inputs) = (rows[~dead], x[~dead], y[~dead], f[~dead], inputs[~dead])
+        else:
+            fitness[rows] = f
 
-        for event in py.event.get():
-            if event.type == py.QUIT:
-                py.quit()
-                return
-
-        (xb, yb) = (0, 0)
-        i = 0
-        while i < len(cars):
-            car = cars[i]
-
-            inp = car.getInputs(world, road)
-            inp.append(car.vel / MAX_VEL)
-            car.commands = nets[i].activate(tuple(inp))
-
-            y_old = car.y
-            (x, y) = car.move(road, t)
-
-            forward_progress = -(y - y_old)
-            ge[i].fitness += forward_progress / 100.0
-            ge[i].fitness += car.vel * SCORE_VEL_MULTIPLIER
-
-            if t > 10 and (
-                car.detectCollision(road)
-                or y > world.getBestCarPos()[1] + BAD_GENOME_TRESHOLD
-                or y > y_old
-                or car.vel < 0.1
-            ):
-                ge[i].fitness -= 1
-                cars.pop(i)
-                nets.pop(i)
-                ge.pop(i)
-                nns.pop(i)
-                continue
-            else:
-                if ge[i].fitness > world.getScore():
-                    world.updateScore(ge[i].fitness)
-                    world.bestNN = nns[i]
-                    world.bestInputs = inp
-                    world.bestCommands = car.commands
-                    world.bestCar = car
-                    world.bestGenome = ge[i]
-                i += 1
-
-            if y < yb:
-                (xb, yb) = (x, y)
-
-        if len(cars) == 0:
+        if len(rows) == 0:
+            prof.lap("bookkeeping")
+            break
+
+        #the first car with the best fitness, as long as it beats the best so far
+        k = int(f.argmax())
+        if f[k] > world.getScore():
+            (g, car) = (ge[rows[k]], cars[rows[k]])
+            world.updateScore(float(f[k]))
+            if render:
+                world.bestNN = get_nn(config, g)
+            world.bestInputs = inputs[k].tolist()
+            world.bestCommands = car.commands
+            world.bestCar = car
+            world.bestGenome = g
+
+        #the camera follows the leading car once it is ahead of the start
+        k = int(y.argmin())
+        (xb, yb) = (float(x[k]), float(y[k])) if y[k] < 0 else (0, 0)
+
+        if max_steps is not None and t >= max_steps:
+            ended_by = "max_steps"
+        elif deadline is not None and time.monotonic() >= deadline:
+            ended_by = "time_budget"
+        elif threshold is not None and world.getScore() >= threshold:
+            ended_by = "fitness_threshold"
+        if ended_by != "all_dead":
+            prof.lap("bookkeeping")
             break
 
         world.updateBestCarPos((xb, yb))
+        prof.lap("bookkeeping")
         road.update(world)
-        draw_win(cars, road, world, GEN)
-
-
-def run_training(config_path, winner_path="winner_genome.pkl", generations=10000):
+        prof.lap("road")
+        if render and pacer.step():
+            if not pacer.handle_events():
+                py.quit()
+                ended_by = "window_closed"
+                break
+            prof.lap("events")
+            draw_win([cars[r] for r in rows.tolist()], road, world, GEN, pacer.label(),
+                     profile=prof.snapshot() if prof.enabled and PROFILE_HUD else None)
+            prof.lap("drawing")
+            pacer.frame_done()
+            prof.lap("wait")
+        elif pacer is not None and pacer.events_due():
+            if not pacer.handle_events():
+                py.quit()
+                ended_by = "window_closed"
+                break
+            prof.lap("events")
+
+    for g, f in zip(ge, fitness.tolist()):
+        g.fitness = f
+    #the cars still running were stopped by the rule that ended the generation
+    for r in rows.tolist():
+        reasons[ge[r].key] = ended_by
+    counts = dict.fromkeys(END_REASONS, 0)
+    for r in reasons.values():
+        counts[r] += 1
+
+    #the visualizations belong to this generation's genomes
+    _nn_cache.clear()
+    _last_episode = {"steps": t, "ended_by": ended_by, "counts": counts, "reasons": reasons}
+    if recorder is not None:
+        recorder.trim()
+        _last_episode["recording"] = {"seed": road.seed, "recorder": recorder,
+                                      "rows": {key: r for r, (key, _) in enumerate(genomes)}}
+    return _last_episode
+
+
+#generations is the total of the run, a resumed run (resume = checkpoint path) only
+#does the ones left and keeps the road seed of the checkpoint.
+#capture = path of a video (.y4m) or PNG directory receiving the drawn generations
+def run_training(config_path, winner_path="winner_genome.pkl", generations=10000, headless=HEADLESS, workers=WORKERS,
+                 seed=ROAD_SEED, profile=PROFILE, resume=None, capture=None):
     global GEN
     GEN = 0
+    #worker processes never draw, so parallel training is always headless
+    enable_headless(headless or workers > 1)
+    #the generations are timed where they run, only possible without workers
+    profile = profile and workers <= 1
+    enable_profiling(profile)
+    #the drawn generations are captured, which needs drawing in this process
+    if capture is not None and not _headless:
+        enable_capture(capture)
 
     config = neat.config.Config(
         neat.DefaultGenome,
@@ -240,13 +633,48 @@ def run_training(config_path, winner_path="winner_genome.pkl", generations=10000
         config_path
     )
 
-    p = neat.Population(config)
+    state = {}
+    if resume is not None:
+        p, state = restore_checkpoint(resume, config)
+        GEN = state["gen"]
+        seed = state["road_seed"]
+        print(f"Resuming from {resume} at generation {GEN}")
+    else:
+        p = neat.Population(config)
+    #every run gets a base seed so its roads can be reproduced later
+    set_road_seed(seed if seed is not None else random.randrange(2**31))
+    print(f"Road seed: {_road_seed}")
+
+    saver = BestGenomeSaver(winner_path, state.get("best_fitness", float("-inf")))
+    checkpointer = AsyncCheckpointer(
+        CHECKPOINT_DIR, CHECKPOINT_EVERY, CHECKPOINT_SECONDS, CHECKPOINT_KEEP,
+        state=lambda: {"gen": GEN, "road_seed": _road_seed, "best_fitness": saver.best_fitness},
+    )
+    report = FileGenerationReporter(REPORT_FILE, profile, append=resume is not None)
+    metrics = MetricsReporter(METRICS_FILE, METRICS_FLUSH_RECORDS, METRICS_FLUSH_SECONDS,
+                              append=resume is not None, extra=generation_metrics)
     p.add_reporter(neat.StdOutReporter(True))
     p.add_reporter(neat.StatisticsReporter())
-    p.add_reporter(FileGenerationReporter(REPORT_FILE))
-    p.add_reporter(BestGenomeSaver(winner_path))
-
-    winner = p.run(eval_genomes, generations)
+    p.add_reporter(report)
+    p.add_reporter(metrics)
+    p.add_reporter(saver)
+    p.add_reporter(checkpointer)
+
+    try:
+        if workers > 1:
+            from parallel_eval import ParallelEvaluator
+            with ParallelEvaluator(workers) as evaluator:
+                winner = p.run(evaluator.evaluate, max(0, generations - GEN))
+        else:
+            winner = p.run(eval_genomes, max(0, generations - GEN))
+    finally:
+        #what is still buffered or being written is finished before leaving
+        checkpointer.close()
+        saver.close()
+        report.close()
+        metrics.close()
+        close_recordings()
+        close_capture()
 
     if winner is not None:
         with open(winner_path, "wb") as f:
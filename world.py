@@ -1,14 +1,23 @@
 import pygame as py
+import numpy as np
 from config_variables import CAMERA_TARGET_Y, CAMERA_SMOOTHING
 
 class World:
     initialPos = (0,0)
     bestCarPos = (0,0)
 
-    def __init__(self, starting_pos, world_width, world_height):
+    #offscreen: frames are drawn into a plain surface (for capture.py) instead of the window
+    def __init__(self, starting_pos, world_width, world_height, offscreen=False):
         self.initialPos = starting_pos
         self.bestCarPos = (0, 0)
-        self.win  = py.display.set_mode((world_width, world_height))
+        self.offscreen = offscreen
+        if offscreen:
+            # the sprites still need a display mode to be converted
+            if py.display.get_surface() is None:
+                py.display.set_mode((1, 1))
+            self.win = py.Surface((world_width, world_height))
+        else:
+            self.win  = py.display.set_mode((world_width, world_height))
         self.win_width = world_width
         self.win_height = world_height
         self.score = 0
@@ -38,6 +47,20 @@ class World:
         return (int(x + self.initialPos[0] - self.bestCarPos[0]),
                 int(y + target_screen_y - self.bestCarPos[1]))
 
+    #getScreenCoords for a whole (n, 2) array of points, returns an (n, 2) int array
+    def getScreenCoordsArray(self, points):
+        target_screen_y = self.win_height * CAMERA_TARGET_Y
+        screen = np.empty(points.shape, dtype=int)
+        screen[:, 0] = points[:, 0] + self.initialPos[0] - self.bestCarPos[0]
+        screen[:, 1] = points[:, 1] + target_screen_y - self.bestCarPos[1]
+        return screen
+
+    #world-y range shown on screen, extended by margin above and below
+    def getVisibleRange(self, margin=0):
+        target_screen_y = self.win_height * CAMERA_TARGET_Y
+        return (self.bestCarPos[1] - target_screen_y - margin,
+                self.bestCarPos[1] - target_screen_y + self.win_height + margin)
+
     def getBestCarPos(self):
         return self.bestCarPos
 